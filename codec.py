@@ -0,0 +1,254 @@
+"""Template encoding shared by the bot and the web UI.
+
+JSON goes through orjson when it is installed and the stdlib otherwise. The
+binary format is a small tagged layout with a key table, so repeated keys such
+as "name"/"value"/"inline" in field lists are only stored once per document.
+Both formats hold the same values: integers must lie between -2**63 and
+2**64 - 1, the range orjson can write.
+"""
+import json
+import struct
+import sys
+import time
+from typing import Any, List, Union
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+BINARY_MAGIC = b"EMB\x01"
+BINARY_SUFFIX = ".embt"
+
+# Value tags for the binary format (10 was an arbitrary-size integer; no longer accepted)
+_NONE, _TRUE, _FALSE, _INT, _FLOAT, _STR, _LIST, _DICT, _KEY_NEW, _KEY_REF = range(10)
+_DOUBLE = struct.Struct("<d")
+MAX_DEPTH = 64  # nested lists/dicts; real templates use about 4
+MAX_VARINT_BYTES = 10  # enough for any zigzagged 64-bit value
+
+
+class CodecError(ValueError):
+    """Data could not be encoded, or decoded as JSON or as a binary template."""
+
+
+def backend() -> str:
+    return "orjson" if orjson is not None else "json"
+
+
+def dumps(obj: Any, indent: bool = False) -> bytes:
+    """Encode to UTF-8 JSON bytes."""
+    try:
+        if orjson is not None:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+        _check_values(obj)
+        if indent:
+            return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    except (TypeError, ValueError) as exc:
+        # orjson.JSONEncodeError subclasses TypeError.
+        raise CodecError(f"Cannot encode as JSON: {exc}") from exc
+
+
+def _check_values(obj: Any) -> None:
+    """Reject what orjson would, so the stdlib fallback accepts the same values."""
+    stack = [obj]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, int) and not -(1 << 63) <= value < (1 << 64):
+            raise ValueError("Integer exceeds 64-bit range")
+        if isinstance(value, dict):
+            if not all(isinstance(key, str) for key in value):
+                raise TypeError("Dict key must be str")
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Decode JSON text or bytes."""
+    try:
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(data)
+    except (json.JSONDecodeError, UnicodeDecodeError) as exc:
+        # orjson.JSONDecodeError subclasses json.JSONDecodeError.
+        raise CodecError(str(exc)) from exc
+    except RecursionError as exc:
+        # The stdlib parser recurses once per nesting level.
+        raise CodecError("JSON is nested too deeply.") from exc
+
+
+def is_binary(data: bytes) -> bool:
+    return data[:len(BINARY_MAGIC)] == BINARY_MAGIC
+
+
+def decode(data: bytes) -> Any:
+    """Decode a stored template, whichever format it was written in."""
+    if is_binary(data):
+        return unpack(data)
+    return loads(data)
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def pack(obj: Any) -> bytes:
+    """Encode JSON-compatible data in the compact binary template format."""
+    out = bytearray(BINARY_MAGIC)
+    keys: dict = {}
+
+    def write_str(value: str) -> None:
+        raw = value.encode("utf-8")
+        _write_varint(out, len(raw))
+        out.extend(raw)
+
+    def write(value: Any) -> None:
+        if value is None:
+            out.append(_NONE)
+        elif value is True:
+            out.append(_TRUE)
+        elif value is False:
+            out.append(_FALSE)
+        elif isinstance(value, int):
+            if not -(1 << 63) <= value < (1 << 64):
+                raise CodecError(f"Integer {value} exceeds 64-bit range.")
+            out.append(_INT)
+            _write_varint(out, value << 1 if value >= 0 else (~value << 1) | 1)  # zigzag
+        elif isinstance(value, float):
+            out.append(_FLOAT)
+            out.extend(_DOUBLE.pack(value))
+        elif isinstance(value, str):
+            out.append(_STR)
+            write_str(value)
+        elif isinstance(value, (list, tuple)):
+            out.append(_LIST)
+            _write_varint(out, len(value))
+            for item in value:
+                write(item)
+        elif isinstance(value, dict):
+            out.append(_DICT)
+            _write_varint(out, len(value))
+            for key, item in value.items():
+                if not isinstance(key, str):
+                    raise CodecError(f"Dict keys must be strings, got {type(key).__name__}.")
+                index = keys.get(key)
+                if index is None:
+                    keys[key] = len(keys)
+                    out.append(_KEY_NEW)
+                    write_str(key)
+                else:
+                    out.append(_KEY_REF)
+                    _write_varint(out, index)
+                write(item)
+        else:
+            raise CodecError(f"Cannot pack {type(value).__name__}.")
+
+    write(obj)
+    return bytes(out)
+
+
+def unpack(data: bytes) -> Any:
+    """Decode data written by `pack`."""
+    if not is_binary(data):
+        raise CodecError("Not a binary embed template.")
+    view = memoryview(data)
+    pos = len(BINARY_MAGIC)
+    keys: List[str] = []
+
+    def read_varint() -> int:
+        nonlocal pos
+        shift = result = 0
+        for _ in range(MAX_VARINT_BYTES):
+            byte = view[pos]
+            pos += 1
+            result |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return result
+            shift += 7
+        raise ValueError(f"varint longer than {MAX_VARINT_BYTES} bytes")
+
+    def read_str() -> str:
+        nonlocal pos
+        size = read_varint()
+        end = pos + size
+        if end > len(view):
+            raise IndexError("string runs past end of data")
+        value = str(view[pos:end], "utf-8")
+        pos = end
+        return value
+
+    def read(depth: int = 0) -> Any:
+        nonlocal pos
+        tag = view[pos]
+        pos += 1
+        if tag in (_DICT, _LIST) and depth >= MAX_DEPTH:
+            raise ValueError(f"nested deeper than {MAX_DEPTH} levels")
+        if tag == _STR:
+            return read_str()
+        if tag == _DICT:
+            result = {}
+            for _ in range(read_varint()):
+                key_tag = view[pos]
+                pos += 1
+                if key_tag == _KEY_REF:
+                    key = keys[read_varint()]
+                elif key_tag == _KEY_NEW:
+                    key = read_str()
+                    keys.append(key)
+                else:
+                    raise ValueError(f"bad key tag {key_tag}")
+                result[key] = read(depth + 1)
+            return result
+        if tag == _LIST:
+            return [read(depth + 1) for _ in range(read_varint())]
+        if tag == _INT:
+            zigzag = read_varint()
+            return (zigzag >> 1) ^ -(zigzag & 1)
+        if tag == _NONE:
+            return None
+        if tag == _TRUE:
+            return True
+        if tag == _FALSE:
+            return False
+        if tag == _FLOAT:
+            (value,) = _DOUBLE.unpack_from(view, pos)
+            pos += _DOUBLE.size
+            return value
+        raise ValueError(f"bad value tag {tag}")
+
+    try:
+        result = read()
+    except (IndexError, ValueError, UnicodeDecodeError, struct.error, RecursionError, MemoryError) as exc:
+        raise CodecError(f"Corrupt binary template at byte {pos}: {exc}") from exc
+    if pos != len(view):
+        raise CodecError(f"Trailing data after binary template at byte {pos}.")
+    return result
+
+
+def _benchmark(paths: List[str], rounds: int = 200) -> None:
+    """Compare size and decode speed of JSON vs binary for the given templates."""
+    for path in paths:
+        with open(path, "rb") as fh:
+            data = decode(fh.read())
+        encoded = {"json": dumps(data), "binary": pack(data)}
+        if unpack(encoded["binary"]) != data or loads(encoded["json"]) != data:
+            print(f"{path}: round trip mismatch")
+            continue
+        for name, blob in encoded.items():
+            decoder = unpack if name == "binary" else loads
+            start = time.perf_counter()
+            for _ in range(rounds):
+                decoder(blob)
+            elapsed = time.perf_counter() - start
+            mb_per_s = len(blob) * rounds / elapsed / 1e6
+            print(f"{path} [{name if name == 'binary' else backend()}]: {len(blob)} bytes, {mb_per_s:.1f} MB/s decode")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        raise SystemExit("Usage: python codec.py template.json [more.json ...]")
+    _benchmark(sys.argv[1:])
@@ -0,0 +1,898 @@
+import asyncio
+import csv
+import io
+import os
+import re
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+import codec
+import embed_state
+from embed_state import (
+    DEFAULT_COLOR,
+    CommandRateLimited,
+    EmbedSession,
+    defer_response,
+    finish_response_policy,
+    get_session,
+    message_cache,
+    message_changes,
+    outbox,
+    rate_limits,
+    respond,
+    send_modal,
+    sent_index,
+    start_response_policy,
+)
+from outbox import OutboxFull
+from ratelimit import admission_keys, command_cost
+from templating import parse_variables, render
+
+DEFAULT_CONFIG_FILE = os.getenv("EMBED_CONFIG_FILE", "embed_config.json")
+TEMPLATE_DIR = Path(os.getenv("EMBED_TEMPLATE_DIR", "."))
+
+# Discord embed limits
+MAX_FIELDS = 25
+MAX_FIELD_NAME = 256
+MAX_FIELD_VALUE = 1024
+MAX_EMBED_CHARS = 6000
+MAX_CONTENT = 2000
+MAX_TITLE = 256
+MAX_DESCRIPTION = 4096
+MAX_FOOTER = 2048
+
+MESSAGE_LINK = re.compile(r"https?://(?:\w+\.)?discord(?:app)?\.com/channels/(\d+|@me)/(\d+)/(\d+)")
+SEND_WAIT = 10.0  # seconds /embed send waits for delivery before reporting the message as queued
+
+
+def embed_is_empty(embed: discord.Embed) -> bool:
+    return not any([embed.title, embed.description, embed.fields, embed.image, embed.thumbnail, embed.author])
+
+
+def copy_with_timestamp(embed: discord.Embed) -> discord.Embed:
+    clone = embed.copy()
+    return clone
+
+
+def template_values(
+    interaction: discord.Interaction, target, raw_variables: Optional[str] = None
+) -> Tuple[bool, dict | str]:
+    """Placeholder values for a message: built-ins plus `key=value; ...` from the command."""
+    values = {
+        "user": interaction.user.mention,
+        "channel": getattr(target, "mention", "DM"),
+        "server": interaction.guild.name if interaction.guild else "",
+        "date": datetime.now(timezone.utc),
+    }
+    if raw_variables:
+        ok, custom = parse_variables(raw_variables)
+        if not ok:
+            return False, custom
+        values.update(custom)  # type: ignore
+    return True, values
+
+
+def render_embed(embed: discord.Embed, values: dict) -> discord.Embed:
+    clone = embed.copy()
+    if embed.title:
+        clone.title = render(embed.title, values, MAX_TITLE)
+    if embed.description:
+        clone.description = render(embed.description, values, MAX_DESCRIPTION)
+    if embed.footer.text:
+        clone.set_footer(text=render(embed.footer.text, values, MAX_FOOTER), icon_url=embed.footer.icon_url)
+    for index, field in enumerate(embed.fields):
+        clone.set_field_at(
+            index,
+            name=render(field.name, values, MAX_FIELD_NAME),
+            value=render(field.value, values, MAX_FIELD_VALUE),
+            inline=field.inline,
+        )
+    return clone
+
+
+def safe_json_path(name: str) -> Path:
+    base = Path(name).name or DEFAULT_CONFIG_FILE
+    if not base.lower().endswith((".json", codec.BINARY_SUFFIX)):
+        base = f"{base}.json"
+    return TEMPLATE_DIR / base
+
+
+def parse_color(raw: str) -> Tuple[bool, Optional[discord.Color] | str]:
+    try:
+        return True, discord.Color.from_str(raw)
+    except (ValueError, TypeError):
+        pass
+
+    raw_clean = raw.replace("#", "").strip()
+    try:
+        value = int(raw_clean, 16)
+    except ValueError:
+        return False, "Color must be a hex value (e.g. #5865F2) or a Discord-named color."
+
+    if not 0 <= value <= 0xFFFFFF:
+        return False, "Color must be a 24-bit hex value."
+
+    return True, discord.Color(value)
+
+
+def apply_embed_data(session: EmbedSession, data: dict) -> Tuple[bool, str]:
+    """Populate a session from a dict that may contain content and multiple embeds."""
+    def build_embed(obj: dict) -> Tuple[bool, Optional[discord.Embed] | str]:
+        embed = discord.Embed(color=DEFAULT_COLOR)
+        embed.title = obj.get("title") if obj.get("title") is not None else None
+        embed.description = obj.get("description") if obj.get("description") is not None else None
+
+        color_raw = obj.get("color")
+        if color_raw:
+            ok, color_val = parse_color(str(color_raw))
+            if not ok:
+                return False, color_val  # type: ignore
+            embed.color = color_val  # type: ignore
+
+        thumb = obj.get("thumbnail")
+        if thumb:
+            embed.set_thumbnail(url=thumb)
+
+        image = obj.get("image")
+        if image:
+            embed.set_image(url=image)
+
+        footer = obj.get("footer")
+        if footer:
+            embed.set_footer(text=footer)
+
+        author = obj.get("author") or {}
+        author_name = author.get("name")
+        author_icon = author.get("icon_url") or None
+        if author_name:
+            embed.set_author(name=author_name, icon_url=author_icon)
+
+        fields = obj.get("fields") or []
+        for field in fields:
+            name = field.get("name")
+            value = field.get("value")
+            if not name or not value:
+                continue
+            inline = bool(field.get("inline", False))
+            embed.add_field(name=name, value=value, inline=inline)
+        return True, embed
+
+    session.reset()
+    session.content = data.get("content") or ""
+
+    embeds_data = data.get("embeds")
+    embeds_to_apply = []
+
+    if isinstance(embeds_data, list) and embeds_data:
+        for obj in embeds_data[:10]:  # Discord allows up to 10 embeds per message
+            ok, emb_or_msg = build_embed(obj)
+            if not ok:
+                return False, f"Color invalid: {emb_or_msg}"
+            embeds_to_apply.append(emb_or_msg)  # type: ignore
+    else:
+        ok, emb_or_msg = build_embed(data)
+        if not ok:
+            return False, f"Color invalid: {emb_or_msg}"
+        embeds_to_apply.append(emb_or_msg)  # type: ignore
+
+    # Apply to session
+    session.embed = embeds_to_apply[0]
+    session.extra_embeds = embeds_to_apply[1:]
+
+    return True, "Embed loaded from import data."
+
+
+def write_embed_json(embed: discord.Embed, out: io.BytesIO) -> None:
+    """Write one embed in the `apply_embed_data` schema, a key at a time."""
+    out.write(b'{"color":')
+    out.write(codec.dumps(f"#{embed.color.value:06X}" if embed.color is not None else None))
+    for key, value in (
+        ("title", embed.title),
+        ("description", embed.description),
+        ("thumbnail", embed.thumbnail.url),
+        ("image", embed.image.url),
+        ("footer", embed.footer.text),
+    ):
+        if value:
+            out.write(b',"%s":' % key.encode())
+            out.write(codec.dumps(value))
+    if embed.author.name:
+        out.write(b',"author":{"name":')
+        out.write(codec.dumps(embed.author.name))
+        out.write(b',"icon_url":')
+        out.write(codec.dumps(embed.author.icon_url or ""))
+        out.write(b"}")
+    out.write(b',"fields":[')
+    for index, field in enumerate(embed.fields):
+        if index:
+            out.write(b",")
+        out.write(b'{"name":')
+        out.write(codec.dumps(field.name))
+        out.write(b',"value":')
+        out.write(codec.dumps(field.value))
+        out.write(b',"inline":true}' if field.inline else b',"inline":false}')
+    out.write(b"]}")
+
+
+def write_session_json(session: EmbedSession, out: io.BytesIO) -> None:
+    """Stream a session into `out` as JSON that `apply_embed_data` loads back unchanged.
+
+    Values are encoded one by one straight into the buffer, so no dict copy of the
+    session or full JSON string is built along the way.
+    """
+    out.write(b'{"content":')
+    out.write(codec.dumps(session.content))
+    out.write(b',"embeds":[')
+    write_embed_json(session.embed, out)
+    for embed in session.extra_embeds:
+        out.write(b",")
+        write_embed_json(embed, out)
+    out.write(b"]}")
+
+
+INLINE_WORDS = {"true": True, "yes": True, "y": True, "1": True, "inline": True,
+                "false": False, "no": False, "n": False, "0": False}
+
+
+def parse_fields_table(text: str) -> Tuple[bool, List[Tuple[str, str, bool]] | str]:
+    """Parse `name | value | inline` rows, or CSV/TSV with the same columns.
+
+    The format is picked from the first row; a `name,value,inline` header row is skipped.
+    """
+    lines = [line for line in text.splitlines() if line.strip()]
+    if not lines:
+        return False, "No rows found."
+
+    rows = []
+    if "|" in lines[0]:
+        for line in lines:
+            cells = [cell.strip() for cell in line.strip().strip("|").split("|")]
+            # Only a recognised flag counts as the inline column; other pipes belong to the value.
+            if len(cells) > 2 and cells[-1].lower() in INLINE_WORDS:
+                rows.append([cells[0], " | ".join(cells[1:-1]), cells[-1]])
+            else:
+                rows.append([cells[0], " | ".join(cells[1:]), ""])
+    else:
+        delimiter = "\t" if "\t" in lines[0] else ","
+        # Read the raw text so quoted values may span lines.
+        reader = csv.reader(io.StringIO(text.strip()), delimiter=delimiter)
+        try:
+            rows = [[cell.strip() for cell in row] for row in reader if any(cell.strip() for cell in row)]
+        except csv.Error as exc:
+            return False, f"Row {reader.line_num}: {exc}"
+
+    if rows and [cell.lower() for cell in rows[0][:2]] == ["name", "value"]:
+        rows = rows[1:]
+
+    fields = []
+    for number, row in enumerate(rows, start=1):
+        if len(row) < 2 or not row[0] or not row[1]:
+            return False, f"Row {number} needs a name and a value."
+        name, value = row[0], row[1]
+        inline = INLINE_WORDS.get(row[2].lower(), False) if len(row) > 2 else False
+        if len(name) > MAX_FIELD_NAME:
+            return False, f"Row {number}: name is longer than {MAX_FIELD_NAME} characters."
+        if len(value) > MAX_FIELD_VALUE:
+            return False, f"Row {number}: value is longer than {MAX_FIELD_VALUE} characters."
+        fields.append((name, value, inline))
+    return True, fields
+
+
+def apply_fields_table(session: EmbedSession, text: str, replace: bool = False) -> Tuple[bool, str]:
+    """Validate every row against the embed limits, then add them all at once."""
+    ok, parsed = parse_fields_table(text)
+    if not ok:
+        return False, parsed  # type: ignore
+
+    embed = session.embed
+    kept = [] if replace else embed.fields
+    if len(kept) + len(parsed) > MAX_FIELDS:
+        return False, f"An embed holds at most {MAX_FIELDS} fields ({len(kept)} already set, {len(parsed)} given)."
+    other_chars = len(embed) - sum(len(f.name) + len(f.value) for f in embed.fields)
+    new_chars = sum(len(f.name) + len(f.value) for f in kept) + sum(len(n) + len(v) for n, v, _ in parsed)
+    if other_chars + new_chars > MAX_EMBED_CHARS:
+        return False, f"Embed text would exceed {MAX_EMBED_CHARS} characters."
+
+    if replace:
+        embed.clear_fields()
+    for name, value, inline in parsed:  # type: ignore
+        embed.add_field(name=name, value=value, inline=inline)
+    return True, f"Added {len(parsed)} field(s); the embed now has {len(embed.fields)}."
+
+
+def embed_to_data(embed: discord.Embed) -> dict:
+    """Convert an embed to the dict shape `apply_embed_data` reads."""
+    return {
+        "title": embed.title,
+        "description": embed.description,
+        "color": f"#{embed.color.value:06X}" if embed.color is not None else None,
+        "thumbnail": embed.thumbnail.url,
+        "image": embed.image.url,
+        "footer": embed.footer.text,
+        "author": {"name": embed.author.name, "icon_url": embed.author.icon_url},
+        "fields": [{"name": f.name, "value": f.value, "inline": f.inline} for f in embed.fields],
+    }
+
+
+def message_to_data(message: discord.Message) -> dict:
+    return {"content": message.content, "embeds": [embed_to_data(e) for e in message.embeds]}
+
+
+async def fetch_message_data(channel_id: int, message_id: int) -> Tuple[discord.abc.Messageable, dict]:
+    client = embed_state.client
+    channel = client.get_channel(channel_id) or await client.fetch_channel(channel_id)
+    return channel, message_to_data(await channel.fetch_message(message_id))
+
+
+def can_read_history(channel, user) -> bool:
+    """Whether `user` may read past messages in a server channel or thread."""
+    if not hasattr(channel, "permissions_for"):
+        return False
+    try:
+        return channel.permissions_for(user).read_message_history
+    except (discord.ClientException, AttributeError):
+        # A thread whose parent isn't cached, or a user who isn't a member of the server.
+        return False
+
+
+class EmbedForm(discord.ui.Modal, title="Embed configurator"):
+    def __init__(self, session: EmbedSession):
+        super().__init__(timeout=300)
+        self.session = session
+
+        self.title_input = discord.ui.TextInput(label="Title", style=discord.TextStyle.short, required=False)
+        self.description_input = discord.ui.TextInput(
+            label="Description", style=discord.TextStyle.paragraph, required=False
+        )
+        self.color_input = discord.ui.TextInput(
+            label="Color (hex or name)", placeholder="#5865F2 or blurple", required=False
+        )
+        self.thumbnail_input = discord.ui.TextInput(
+            label="Thumbnail URL", placeholder="https://example.com/thumb.png", required=False
+        )
+        self.image_input = discord.ui.TextInput(
+            label="Image URL", placeholder="https://example.com/image.png", required=False
+        )
+
+        for item in (
+            self.title_input,
+            self.description_input,
+            self.color_input,
+            self.thumbnail_input,
+            self.image_input,
+        ):
+            self.add_item(item)
+
+    async def on_submit(self, interaction: discord.Interaction) -> None:
+        embed = self.session.embed
+        embed.title = self.title_input.value if self.title_input.value is not None else None
+        embed.description = self.description_input.value if self.description_input.value is not None else None
+
+        if self.color_input.value:
+            ok, msg = self.session.set_color(self.color_input.value)
+            if not ok:
+                await respond(interaction, f"Color not set: {msg}", ephemeral=True)
+                return
+
+        if self.thumbnail_input.value:
+            embed.set_thumbnail(url=self.thumbnail_input.value)
+        if self.image_input.value:
+            embed.set_image(url=self.image_input.value)
+
+        preview = copy_with_timestamp(embed)
+        await respond(interaction, "Embed updated from form.", embed=preview, ephemeral=True)
+
+
+class BulkFieldsForm(discord.ui.Modal, title="Add fields"):
+    def __init__(self, session: EmbedSession, replace: bool = False):
+        super().__init__(timeout=300)
+        self.session = session
+        self.replace = replace
+        self.table_input = discord.ui.TextInput(
+            label="One field per line: name | value | inline",
+            style=discord.TextStyle.paragraph,
+            placeholder="Rule 1 | Be kind | false\nRule 2 | No spam | false",
+            max_length=4000,
+        )
+        self.add_item(self.table_input)
+
+    async def on_submit(self, interaction: discord.Interaction) -> None:
+        ok, msg = apply_fields_table(self.session, self.table_input.value, self.replace)
+        if not ok:
+            await respond(interaction, f"No fields added: {msg}", ephemeral=True)
+            return
+        await respond(interaction, msg, embed=copy_with_timestamp(self.session.embed), ephemeral=True)
+
+
+class EmbedCommands(app_commands.Group):
+    def __init__(self) -> None:
+        super().__init__(name="embed", description="Build and send embeds")
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        name = interaction.command.name if interaction.command else ""
+        command_class, cost = command_cost(name)
+        keys = admission_keys(command_class, interaction.user.id, interaction.guild_id)
+        retry_after = rate_limits.acquire(keys, cost)
+        if retry_after:
+            await respond(
+                interaction, f"You're doing that too often. Try again in {max(1, round(retry_after))}s.", ephemeral=True
+            )
+            raise CommandRateLimited(retry_after)
+        start_response_policy(interaction)
+        return True
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError) -> None:
+        finish_response_policy(interaction)
+
+    @app_commands.command(name="form", description="Open a form to set title/description/colors/images")
+    @app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+    @app_commands.allowed_installs(guilds=True, users=True)
+    async def form(self, interaction: discord.Interaction) -> None:
+        session = get_session(interaction.user.id)
+        await send_modal(interaction, EmbedForm(session))
+
+    @app_commands.command(name="add_field", description="Add a field to your embed")
+    @app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+    @app_commands.allowed_installs(guilds=True, users=True)
+    async def add_field(self, interaction: discord.Interaction, name: str, value: str, inline: bool = False) -> None:
+        session = get_session(interaction.user.id)
+        session.embed.add_field(name=name, value=value, inline=inline)
+        await respond(interaction, f"Added field `{name}`.", ephemeral=True)
+
+    @app_commands.command(name="fields_bulk", description="Add many fields at once from a form or a CSV/TSV file")
+    @app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+    @app_commands.allowed_installs(guilds=True, users=True)
+    async def fields_bulk(
+        self, interaction: discord.Interaction, file: Optional[discord.Attachment] = None, replace: bool = False
+    ) -> None:
+        session = get_session(interaction.user.id)
+        if file is None:
+            await send_modal(interaction, BulkFieldsForm(session, replace))
+            return
+
+        if file.size > 256 * 1024:
+            await respond(interaction, "File too large. Max 256KB.", ephemeral=True)
+            return
+
+        await defer_response(interaction)
+        try:
+            text = (await file.read()).decode("utf-8-sig")
+        except UnicodeDecodeError:
+            await respond(interaction, "File must be UTF-8 text.", ephemeral=True)
+            return
+
+        ok, msg = apply_fields_table(session, text, replace)
+        if not ok:
+            await respond(interaction, f"No fields added: {msg}", ephemeral=True)
+            return
+        await respond(interaction, msg, embed=copy_with_timestamp(session.embed), ephemeral=True)
+
+    @app_commands.command(name="clear_fields", description="Remove all fields")
+    @app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+    @app_commands.allowed_installs(guilds=True, users=True)
+    async def clear_fields(self, interaction: discord.Interaction) -> None:
+        session = get_session(interaction.user.id)
+        session.embed.clear_fields()
+        await respond(interaction, "Cleared all fields.", ephemeral=True)
+
+    @app_commands.command(name="preview", description="Preview your current embed")
+    @app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+    @app_commands.allowed_installs(guilds=True, users=True)
+    async def preview(self, interaction: discord.Interaction, variables: Optional[str] = None) -> None:
+        session = get_session(interaction.user.id)
+        embeds = [copy_with_timestamp(session.embed)] + [copy_with_timestamp(e) for e in session.extra_embeds]
+        usable_embeds = [e for e in embeds if not embed_is_empty(e)]
+
+        if not usable_embeds and not session.content.strip():
+            await respond(interaction, "Nothing to preview yet. Add content or an embed first.", ephemeral=True)
+            return
+
+        ok, values = template_values(interaction, interaction.channel, variables)
+        if not ok:
+            await respond(interaction, f"Variables not understood: {values}", ephemeral=True)
+            return
+
+        content_text = render(session.content, values, MAX_CONTENT) or "Preview (no message content set)"  # type: ignore
+        rendered = [render_embed(e, values) for e in usable_embeds[:10]]  # type: ignore
+        await respond(interaction, content_text, embeds=rendered, ephemeral=True)
+
+    @app_commands.command(name="send", description="Send your embed to a channel (or here)")
+    @app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+    @app_commands.allowed_installs(guilds=True, users=True)
+    async def send(
+        self,
+        interaction: discord.Interaction,
+        channel: Optional[discord.TextChannel] = None,
+        variables: Optional[str] = None,
+    ) -> None:
+        session = get_session(interaction.user.id)
+        embeds = [copy_with_timestamp(session.embed)] + [copy_with_timestamp(e) for e in session.extra_embeds]
+        usable_embeds = [e for e in embeds if not embed_is_empty(e)]
+
+        if not usable_embeds and not session.content.strip():
+            await respond(interaction, "Cannot send an empty message. Add content or an embed first.", ephemeral=True)
+            return
+
+        target = channel or interaction.channel
+        if not hasattr(target, "send"):
+            await respond(interaction, "Cannot send to that target.", ephemeral=True)
+            return
+
+        ok, values = template_values(interaction, target, variables)
+        if not ok:
+            await respond(interaction, f"Variables not understood: {values}", ephemeral=True)
+            return
+
+        try:
+            job = outbox.enqueue(
+                interaction.user.id,
+                target.id,
+                render(session.content, values, MAX_CONTENT),  # type: ignore
+                [render_embed(e, values).to_dict() for e in usable_embeds[:10]],  # type: ignore
+            )
+        except OutboxFull as exc:
+            await respond(interaction, f"{exc} Try again in a moment.", ephemeral=True)
+            return
+
+        await defer_response(interaction)
+        try:
+            await asyncio.wait_for(asyncio.shield(job.done), timeout=SEND_WAIT)
+        except asyncio.TimeoutError:
+            await respond(
+                interaction,
+                f"Discord is slow to accept messages right now. Your message is queued "
+                f"(#{outbox.position(job) or 1} for that channel) and will be retried.",
+                ephemeral=True,
+            )
+            return
+        except discord.Forbidden:
+            await respond(
+                interaction,
+                "I don't have permission to send messages or embeds in that channel.", ephemeral=True
+            )
+            return
+        except (discord.HTTPException, OSError) as exc:
+            await respond(interaction, f"Failed to send embed: {exc}", ephemeral=True)
+            return
+
+        target_label = getattr(target, "mention", "DM")
+        await respond(interaction, f"Message sent to {target_label}", ephemeral=True)
+
+    @app_commands.command(name="edit", description="Update a message you sent with your current embed")
+    @app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+    @app_commands.allowed_installs(guilds=True, users=True)
+    async def edit(
+        self,
+        interaction: discord.Interaction,
+        channel: Optional[discord.TextChannel] = None,
+        message_id: Optional[str] = None,
+        variables: Optional[str] = None,
+    ) -> None:
+        session = get_session(interaction.user.id)
+        target = channel or interaction.channel
+        if target is None or not hasattr(target, "get_partial_message"):
+            await respond(interaction, "Cannot edit messages in that target.", ephemeral=True)
+            return
+
+        wanted_id: Optional[int] = None
+        if message_id:
+            try:
+                wanted_id = int(message_id.strip())
+            except ValueError:
+                await respond(interaction, "Message ID must be a number.", ephemeral=True)
+                return
+
+        record = sent_index.lookup(interaction.user.id, target.id, wanted_id)
+        if record is None:
+            await respond(
+                interaction,
+                "No message sent by you through the bot was found there. Use /embed send first.", ephemeral=True
+            )
+            return
+
+        embeds = [copy_with_timestamp(session.embed)] + [copy_with_timestamp(e) for e in session.extra_embeds]
+        usable_embeds = [e for e in embeds if not embed_is_empty(e)][:10]
+        if not usable_embeds and not session.content.strip():
+            await respond(interaction, "Cannot edit to an empty message. Add content or an embed first.", ephemeral=True)
+            return
+
+        ok, values = template_values(interaction, target, variables)
+        if not ok:
+            await respond(interaction, f"Variables not understood: {values}", ephemeral=True)
+            return
+        content = render(session.content, values, MAX_CONTENT)  # type: ignore
+        usable_embeds = [render_embed(e, values) for e in usable_embeds]  # type: ignore
+
+        sent_id = record[0]
+        changes = message_changes(record, content, usable_embeds)
+        if not changes:
+            await respond(interaction, "Nothing changed since that message was sent.", ephemeral=True)
+            return
+
+        await defer_response(interaction)
+        try:
+            await target.get_partial_message(sent_id).edit(**changes)
+        except discord.NotFound:
+            await respond(interaction, "That message no longer exists.", ephemeral=True)
+            return
+        except discord.Forbidden:
+            await respond(interaction, "I don't have permission to edit that message.", ephemeral=True)
+            return
+        except discord.HTTPException as exc:
+            await respond(interaction, f"Failed to edit message: {exc}", ephemeral=True)
+            return
+
+        sent_index.record(interaction.user.id, target.id, sent_id, content, usable_embeds)
+        updated = " and ".join(changes)
+        await respond(interaction, f"Updated {updated} of the message.", ephemeral=True)
+
+    @app_commands.command(name="reset", description="Start a fresh embed")
+    @app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+    @app_commands.allowed_installs(guilds=True, users=True)
+    async def reset(self, interaction: discord.Interaction) -> None:
+        session = get_session(interaction.user.id)
+        session.reset()
+        await respond(interaction, "Started a new blank embed.", ephemeral=True)
+
+    @app_commands.command(name="import", description="Load embed config from a local JSON or .embt file")
+    @app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+    @app_commands.allowed_installs(guilds=True, users=True)
+    async def import_(self, interaction: discord.Interaction, file_name: Optional[str] = None) -> None:
+        session = get_session(interaction.user.id)
+        path = safe_json_path(file_name or DEFAULT_CONFIG_FILE)
+        if not path.exists():
+            await respond(interaction, f"No import file found at {path.resolve()}", ephemeral=True)
+            return
+
+        try:
+            # Read off the event loop so the response timer can still fire on a slow disk.
+            data = codec.decode(await asyncio.to_thread(path.read_bytes))
+        except codec.CodecError as exc:
+            await respond(interaction, f"Import file is not a valid template: {exc}", ephemeral=True)
+            return
+
+        ok, msg = apply_embed_data(session, data)
+        if not ok:
+            await respond(interaction, f"Import failed: {msg}", ephemeral=True)
+            return
+
+        embeds = [copy_with_timestamp(session.embed)] + [copy_with_timestamp(e) for e in session.extra_embeds]
+        usable_embeds = [e for e in embeds if not embed_is_empty(e)]
+        preview_text = msg if not session.content else f"{msg}\n\n{session.content}"
+        await respond(interaction, preview_text, embeds=usable_embeds[:10], ephemeral=True)
+
+    @app_commands.command(name="import_file", description="Upload a JSON or .embt embed config to load")
+    @app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+    @app_commands.allowed_installs(guilds=True, users=True)
+    async def import_file(self, interaction: discord.Interaction, file: discord.Attachment) -> None:
+        session = get_session(interaction.user.id)
+
+        if file.size > 256 * 1024:
+            await respond(interaction, "File too large. Max 256KB.", ephemeral=True)
+            return
+
+        await defer_response(interaction)
+        try:
+            content = await file.read()
+            data = codec.decode(content)
+        except codec.CodecError as exc:
+            await respond(interaction, f"Invalid template file (expected UTF-8 JSON or {codec.BINARY_SUFFIX}): {exc}", ephemeral=True)
+            return
+
+        ok, msg = apply_embed_data(session, data)
+        if not ok:
+            await respond(interaction, f"Import failed: {msg}", ephemeral=True)
+            return
+
+        embeds = [copy_with_timestamp(session.embed)] + [copy_with_timestamp(e) for e in session.extra_embeds]
+        usable_embeds = [e for e in embeds if not embed_is_empty(e)]
+        preview_text = f"{msg} (from upload)"
+        if session.content:
+            preview_text = f"{preview_text}\n\n{session.content}"
+        await respond(interaction, preview_text, embeds=usable_embeds[:10], ephemeral=True)
+
+    @app_commands.command(name="clone", description="Load content and embeds from an existing message link")
+    @app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+    @app_commands.allowed_installs(guilds=True, users=True)
+    async def clone(self, interaction: discord.Interaction, message_link: str) -> None:
+        session = get_session(interaction.user.id)
+        match = MESSAGE_LINK.search(message_link)
+        if not match:
+            await respond(interaction, "That doesn't look like a message link (Copy Message Link).", ephemeral=True)
+            return
+        guild_part, channel_id, message_id = match.group(1), int(match.group(2)), int(match.group(3))
+
+        # Only clone from where the user is, so the bot can't be used to read other servers or DMs.
+        if guild_part == "@me":
+            allowed = channel_id == interaction.channel_id
+        else:
+            allowed = int(guild_part) == interaction.guild_id
+        if not allowed:
+            await respond(interaction, "You can only clone messages from the server or DM you're in.", ephemeral=True)
+            return
+
+        await defer_response(interaction)
+        try:
+            channel, data = await message_cache.get(channel_id, message_id)
+        except discord.NotFound:
+            await respond(interaction, "That message or channel no longer exists.", ephemeral=True)
+            return
+        except discord.Forbidden:
+            await respond(interaction, "I can't read that channel.", ephemeral=True)
+            return
+        except discord.HTTPException as exc:
+            await respond(interaction, f"Failed to fetch message: {exc}", ephemeral=True)
+            return
+        # Checked on every use, cached or not: the message is only shown to users who could read it.
+        if guild_part != "@me":
+            if getattr(getattr(channel, "guild", None), "id", None) != interaction.guild_id:
+                # The link named this server, but the channel ID belongs to another one.
+                await respond(
+                    interaction, "You can only clone messages from the server or DM you're in.", ephemeral=True
+                )
+                return
+            if not can_read_history(channel, interaction.user):
+                await respond(interaction, "You can't read messages in that channel.", ephemeral=True)
+                return
+
+        if not data["content"] and not data["embeds"]:
+            await respond(interaction, "That message has no text or embeds I can see.", ephemeral=True)
+            return
+
+        ok, msg = apply_embed_data(session, data)
+        if not ok:
+            await respond(interaction, f"Clone failed: {msg}", ephemeral=True)
+            return
+
+        embeds = [copy_with_timestamp(session.embed)] + [copy_with_timestamp(e) for e in session.extra_embeds]
+        usable_embeds = [e for e in embeds if not embed_is_empty(e)]
+        preview_text = "Loaded the message into your session."
+        if session.content:
+            preview_text = f"{preview_text}\n\n{session.content}"
+        await respond(interaction, preview_text, embeds=usable_embeds[:10], ephemeral=True)
+
+    @app_commands.command(name="export", description="Download your current message as a JSON file")
+    @app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+    @app_commands.allowed_installs(guilds=True, users=True)
+    async def export(self, interaction: discord.Interaction, file_name: Optional[str] = None) -> None:
+        session = get_session(interaction.user.id)
+        buffer = io.BytesIO()
+        write_session_json(session, buffer)
+        buffer.seek(0)
+        name = safe_json_path(file_name or "embed_export.json").with_suffix(".json").name
+        await respond(
+            interaction,
+            f"Exported {1 + len(session.extra_embeds)} embed(s). Load it again with /embed import_file.",
+            file=discord.File(buffer, filename=name),
+            ephemeral=True,
+        )
+
+    @app_commands.command(name="summary", description="Show a quick summary of your embed")
+    @app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+    @app_commands.allowed_installs(guilds=True, users=True)
+    async def summary(self, interaction: discord.Interaction) -> None:
+        session = get_session(interaction.user.id)
+        embed = session.embed
+        lines = [
+            f"Content length: {len(session.content)}",
+            f"Embed count: {1 + len(session.extra_embeds)}",
+            f"Title (first): {embed.title or '-'}",
+            f"Description (first): {bool(embed.description)}",
+            f"Fields (first): {len(embed.fields)}",
+            f"Color (first): {embed.color.value:06X}",
+        ]
+        await respond(interaction, "\n".join(lines), ephemeral=True)
+
+    @app_commands.command(name="footer", description="Set footer text")
+    @app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+    @app_commands.allowed_installs(guilds=True, users=True)
+    async def footer(self, interaction: discord.Interaction, text: str) -> None:
+        session = get_session(interaction.user.id)
+        footer_icon = session.embed.footer.icon_url or None
+        session.embed.set_footer(text=text, icon_url=footer_icon)
+        await respond(interaction, "Footer set.", ephemeral=True)
+
+    @app_commands.command(name="author", description="Set author name and optional icon URL")
+    @app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+    @app_commands.allowed_installs(guilds=True, users=True)
+    async def author(
+        self, interaction: discord.Interaction, name: str, icon_url: Optional[str] = None
+    ) -> None:
+        session = get_session(interaction.user.id)
+        session.embed.set_author(name=name, icon_url=icon_url or None)
+        await respond(interaction, "Author set.", ephemeral=True)
+
+    @app_commands.command(name="content", description="Set message text to send with embeds")
+    @app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+    @app_commands.allowed_installs(guilds=True, users=True)
+    async def content(self, interaction: discord.Interaction, text: str) -> None:
+        session = get_session(interaction.user.id)
+        session.content = text
+        await respond(interaction, "Content set.", ephemeral=True)
+
+
+async def setup(bot: commands.Bot) -> None:
+    embed_state.client = bot
+    message_cache.fetch = fetch_message_data
+    bot.tree.add_command(EmbedCommands())
+
+
+async def teardown(bot: commands.Bot) -> None:
+    bot.tree.remove_command("embed")
+
+
+class _BenchInteraction:
+    """Stand-in for `discord.Interaction` that answers after `round_trip` seconds and counts replies."""
+
+    def __init__(self, interaction_id: int, user_id: int, round_trip: float) -> None:
+        self.id = interaction_id
+        self.user = type("User", (), {"id": user_id})()
+        self.round_trip = round_trip
+        self.responses = 0
+        self._done = False
+        self.response = self
+        self.followup = self
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def send_message(self, *args, **kwargs) -> None:
+        await asyncio.sleep(self.round_trip)
+        self._done = True
+        self.responses += 1
+
+    defer = send_message
+    send = send_message
+
+
+class _BenchAttachment:
+    def __init__(self, text: str) -> None:
+        self.data = text.encode("utf-8")
+        self.size = len(self.data)
+
+    async def read(self) -> bytes:
+        return self.data
+
+
+async def _benchmark_fields(rows: int = 25, rounds: int = 20, round_trip: float = 0.0) -> None:
+    """Time `rows` /embed add_field calls against one /embed fields_bulk upload of the same rows."""
+    group = EmbedCommands()
+    table = "\n".join(f"Rule {i} | Be kind to member #{i} | {'yes' if i % 2 else 'no'}" for i in range(1, rows + 1))
+    user_id = 0
+    for name in ("add_field", "fields_bulk"):
+        interactions = responses = 0
+        started = time.perf_counter()
+        for _ in range(rounds):
+            user_id += 1
+            if name == "add_field":
+                for line in table.splitlines():
+                    field_name, value, inline = (part.strip() for part in line.split("|"))
+                    interaction = _BenchInteraction(interactions, user_id, round_trip)
+                    await group.add_field.callback(group, interaction, field_name, value, INLINE_WORDS[inline])
+                    interactions += 1
+                    responses += interaction.responses
+            else:
+                interaction = _BenchInteraction(interactions, user_id, round_trip)
+                await group.fields_bulk.callback(group, interaction, _BenchAttachment(table))
+                interactions += 1
+                responses += interaction.responses
+            assert len(get_session(user_id).embed.fields) == rows
+            embed_state.sessions.pop(user_id)
+        elapsed = time.perf_counter() - started
+        print(
+            f"{name}: {interactions // rounds} interaction(s) and {responses // rounds} response(s) per {rows} fields, "
+            f"{elapsed / rounds * 1000:.2f} ms per table"
+        )
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Optional argument: simulated Discord round trip per response, in seconds (e.g. 0.1).
+    asyncio.run(_benchmark_fields(round_trip=float(sys.argv[1]) if len(sys.argv) > 1 else 0.0))
@@ -0,0 +1,358 @@
+"""State shared by the bot and the `/embed` command extension.
+
+This module is not reloaded with `embed_commands`, so sessions, the sent-message
+index, the send queue, rate limit buckets and caches survive a hot reload.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import discord
+from discord import app_commands
+
+import codec
+from outbox import Outbox, OutboxJob
+from ratelimit import TokenBuckets
+from storage import SnapshotWriter
+
+# Basic config
+DEFAULT_COLOR = discord.Color.blurple()
+SENT_INDEX_FILE = os.getenv("EMBED_SENT_INDEX_FILE", "sent_index.json")
+SENT_INDEX_MAX_KEYS = 1024  # (user, channel) pairs remembered
+SENT_INDEX_PER_KEY = 5  # recent messages remembered per pair
+# Discord fails the interaction if it is not acknowledged within 3 seconds.
+RESPONSE_BUDGET = float(os.getenv("EMBED_RESPONSE_BUDGET", "2.0"))
+CLONE_CACHE_TTL = 120.0  # seconds a fetched message is reused by /embed clone
+CLONE_CACHE_SIZE = 128
+OUTBOX_FILE = os.getenv("EMBED_OUTBOX_FILE", "outbox.json")
+
+# Set by the extension's setup(); used by background work that outlives a command.
+client: Optional[discord.Client] = None
+
+
+class EmbedSession:
+    """Keeps an in-progress embed per user."""
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.embed = discord.Embed(color=DEFAULT_COLOR)
+        self.extra_embeds: list[discord.Embed] = []
+        self.content: str = ""
+
+    def set_color(self, raw: str) -> Tuple[bool, str]:
+        try:
+            self.embed.color = discord.Color.from_str(raw)
+            return True, f"Set color to `{raw}`."
+        except (ValueError, TypeError):
+            pass
+
+        raw_clean = raw.replace("#", "").strip()
+        try:
+            value = int(raw_clean, 16)
+        except ValueError:
+            return False, "Color must be a hex value (e.g. #5865F2) or a Discord-named color."
+
+        if not 0 <= value <= 0xFFFFFF:
+            return False, "Color must be a 24-bit hex value."
+
+        self.embed.color = discord.Color(value)
+        return True, f"Set color to `#{raw_clean}`."
+
+
+sessions: Dict[int, EmbedSession] = {}
+
+
+def get_session(user_id: int) -> EmbedSession:
+    session = sessions.get(user_id)
+    if not session:
+        session = EmbedSession()
+        sessions[user_id] = session
+    return session
+
+
+def fingerprint(obj) -> str:
+    """Short stable hash of JSON-able data, used to detect edits."""
+    raw = json.dumps(obj, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def message_fingerprints(content: str, embeds: List[discord.Embed]) -> Tuple[str, List[str]]:
+    return fingerprint(content or ""), [fingerprint(e.to_dict()) for e in embeds]
+
+
+def message_changes(record: list, content: str, embeds: List[discord.Embed]) -> Dict[str, Any]:
+    """Keyword arguments for `Message.edit` covering what differs from a sent-index record.
+
+    Empty when the message already shows this content and these embeds.
+    """
+    _, old_content_fp, old_embed_fps = record
+    content_fp, embed_fps = message_fingerprints(content, embeds)
+    changes: Dict[str, Any] = {}
+    if content_fp != old_content_fp:
+        changes["content"] = content or None
+    if embed_fps != old_embed_fps:
+        # Discord replaces the whole embed list on edit, so any change resends all of them.
+        changes["embeds"] = embeds
+    return changes
+
+
+class SentMessageIndex:
+    """Bounded record of messages the bot sent for each (user, channel) pair.
+
+    Each entry stores the message id plus fingerprints of the content and every
+    embed, so `/embed edit` can tell what changed without fetching the message.
+    The least recently used pairs are dropped once `max_keys` is reached.
+    """
+
+    def __init__(self, path: Optional[Path] = None, max_keys: int = SENT_INDEX_MAX_KEYS,
+                 per_key: int = SENT_INDEX_PER_KEY) -> None:
+        self.path = path
+        self.max_keys = max_keys
+        self.per_key = per_key
+        # (user_id, channel_id) -> [[message_id, content_fp, [embed_fp, ...]], ...], newest last
+        self._entries: "OrderedDict[Tuple[int, int], list]" = OrderedDict()
+        self._writer = SnapshotWriter(path, self._snapshot, "sent message index")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def record(self, user_id: int, channel_id: int, message_id: int, content: str,
+               embeds: List[discord.Embed]) -> None:
+        content_fp, embed_fps = message_fingerprints(content, embeds)
+        key = (user_id, channel_id)
+        records = [r for r in self._entries.pop(key, []) if r[0] != message_id]
+        records.append([message_id, content_fp, embed_fps])
+        self._entries[key] = records[-self.per_key:]
+        while len(self._entries) > self.max_keys:
+            self._entries.popitem(last=False)
+        self._writer.request()
+
+    def lookup(self, user_id: int, channel_id: int, message_id: Optional[int] = None) -> Optional[list]:
+        """Return the newest record, or the one matching `message_id`, for this pair."""
+        key = (user_id, channel_id)
+        records = self._entries.get(key)
+        if not records:
+            return None
+        self._entries.move_to_end(key)
+        if message_id is None:
+            return records[-1]
+        for record in records:
+            if record[0] == message_id:
+                return record
+        return None
+
+    def _snapshot(self) -> bytes:
+        return codec.dumps([[user_id, channel_id, records] for (user_id, channel_id), records in self._entries.items()])
+
+    def save(self) -> None:
+        self._writer.write_now()
+
+    async def flush(self) -> None:
+        await self._writer.flush()
+
+    def load(self) -> None:
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            payload = codec.loads(self.path.read_bytes())
+        except (OSError, codec.CodecError) as exc:
+            print(f"Could not load sent message index: {exc}")
+            return
+        self._entries.clear()
+        for user_id, channel_id, records in payload[-self.max_keys:]:
+            self._entries[(int(user_id), int(channel_id))] = records[-self.per_key:]
+
+
+sent_index = SentMessageIndex(Path(SENT_INDEX_FILE))
+
+
+class ResponsePolicy:
+    """Acknowledges an interaction in time even when the command runs long.
+
+    A timer defers the interaction once `budget` seconds pass without a reply;
+    `respond` then goes through the followup webhook instead. The lock stops the
+    timer and the command from both sending the initial response.
+    """
+
+    def __init__(self, interaction: discord.Interaction, budget: float = RESPONSE_BUDGET) -> None:
+        self.interaction = interaction
+        self.started = time.perf_counter()
+        self.auto_deferred = False
+        self.lock = asyncio.Lock()
+        self.timer = asyncio.create_task(self._defer_after(budget))
+
+    async def _defer_after(self, budget: float) -> None:
+        await asyncio.sleep(budget)
+        async with self.lock:
+            if not self.interaction.response.is_done():
+                try:
+                    await self.interaction.response.defer(ephemeral=True, thinking=True)
+                except discord.HTTPException as exc:
+                    # Usually the interaction already expired; the command's own reply will fail too.
+                    print(f"Could not auto-defer interaction {self.interaction.id}: {exc}")
+                    return
+                self.auto_deferred = True
+
+    def _stop_timer(self) -> None:
+        # Only called with the lock held, so the timer is never cut off mid-defer.
+        if not self.timer.done():
+            self.timer.cancel()
+
+    async def defer(self) -> None:
+        async with self.lock:
+            self._stop_timer()
+            if not self.interaction.response.is_done():
+                await self.interaction.response.defer(ephemeral=True, thinking=True)
+
+    async def send(self, content: Optional[str] = None, **kwargs) -> None:
+        async with self.lock:
+            self._stop_timer()
+            if self.interaction.response.is_done():
+                await self.interaction.followup.send(content, **kwargs)
+            else:
+                await self.interaction.response.send_message(content, **kwargs)
+
+    async def send_modal(self, modal: discord.ui.Modal) -> bool:
+        async with self.lock:
+            self._stop_timer()
+            if self.interaction.response.is_done():
+                return False
+            await self.interaction.response.send_modal(modal)
+            return True
+
+    def close(self) -> float:
+        self.timer.cancel()
+        return time.perf_counter() - self.started
+
+
+response_policies: Dict[int, ResponsePolicy] = {}
+command_calls: Counter = Counter()
+slow_path_calls: Counter = Counter()
+
+
+def start_response_policy(interaction: discord.Interaction) -> ResponsePolicy:
+    policy = ResponsePolicy(interaction)
+    response_policies[interaction.id] = policy
+    return policy
+
+
+def finish_response_policy(interaction: discord.Interaction) -> None:
+    policy = response_policies.pop(interaction.id, None)
+    if policy is None:
+        return
+    elapsed = policy.close()
+    name = interaction.command.qualified_name if interaction.command else "unknown"
+    command_calls[name] += 1
+    if policy.auto_deferred:
+        slow_path_calls[name] += 1
+        print(f"/{name} auto-deferred after {elapsed:.2f}s ({slow_path_calls[name]}/{command_calls[name]} calls)")
+
+
+async def respond(interaction: discord.Interaction, content: Optional[str] = None, **kwargs) -> None:
+    """Reply through the initial response or the followup, whichever is still open."""
+    policy = response_policies.get(interaction.id)
+    if policy is not None:
+        await policy.send(content, **kwargs)
+    elif interaction.response.is_done():
+        await interaction.followup.send(content, **kwargs)
+    else:
+        await interaction.response.send_message(content, **kwargs)
+
+
+async def send_modal(interaction: discord.Interaction, modal: discord.ui.Modal) -> None:
+    """Open a modal, or explain why not if the interaction was already acknowledged."""
+    policy = response_policies.get(interaction.id)
+    if policy is not None:
+        opened = await policy.send_modal(modal)
+    elif not interaction.response.is_done():
+        await interaction.response.send_modal(modal)
+        opened = True
+    else:
+        opened = False
+    if not opened:
+        # A modal can only be the first response; after a defer all we can do is say so.
+        await interaction.followup.send(
+            "That took too long to open the form. Please run the command again.", ephemeral=True
+        )
+
+
+async def defer_response(interaction: discord.Interaction) -> None:
+    policy = response_policies.get(interaction.id)
+    if policy is not None:
+        await policy.defer()
+    elif not interaction.response.is_done():
+        await interaction.response.defer(ephemeral=True, thinking=True)
+
+
+class CommandRateLimited(app_commands.CheckFailure):
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"Rate limited for {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+async def deliver_job(job: OutboxJob) -> discord.Message:
+    channel = client.get_channel(job.channel_id) or await client.fetch_channel(job.channel_id)
+    embeds = [discord.Embed.from_dict(data) for data in job.embeds]
+    return await channel.send(content=job.content or None, embeds=embeds)
+
+
+def job_delivered(job: OutboxJob, message: discord.Message) -> None:
+    embeds = [discord.Embed.from_dict(data) for data in job.embeds]
+    sent_index.record(job.user_id, message.channel.id, message.id, job.content, embeds)
+
+
+outbox = Outbox(deliver_job, Path(OUTBOX_FILE), on_delivered=job_delivered)
+rate_limits = TokenBuckets()
+
+
+class MessageFetchCache:
+    """Short-lived cache of fetched messages, already converted to import data.
+
+    Each entry is the (channel, data) pair the fetcher returned, so callers can
+    check permissions on the channel without resolving it again. Concurrent
+    requests for the same message share one in-flight fetch, results are reused
+    for `ttl` seconds, and failed fetches are not cached.
+    """
+
+    def __init__(self, fetch, ttl: float = CLONE_CACHE_TTL, max_entries: int = CLONE_CACHE_SIZE) -> None:
+        self.fetch = fetch  # async (channel_id, message_id) -> (channel, dict)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.fetches = 0
+        self._entries: "OrderedDict[Tuple[int, int], Tuple[float, Tuple[Any, dict]]]" = OrderedDict()
+        self._inflight: Dict[Tuple[int, int], asyncio.Future] = {}
+
+    async def get(self, channel_id: int, message_id: int) -> Tuple[Any, dict]:
+        key = (channel_id, message_id)
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                return entry[1]
+            del self._entries[key]
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so one caller timing out doesn't cancel the fetch for everyone else.
+        return await asyncio.shield(task)
+
+    async def _load(self, key: Tuple[int, int]) -> Tuple[Any, dict]:
+        self.fetches += 1
+        result = await self.fetch(*key)
+        self._entries[key] = (time.monotonic() + self.ttl, result)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return result
+
+
+message_cache = MessageFetchCache(None)  # fetcher installed by the extension
@@ -0,0 +1,239 @@
+import asyncio
+import random
+from collections import Counter, deque
+from itertools import count
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+import discord
+
+import codec
+from storage import SnapshotWriter
+
+# Defaults for the bot's send queue
+MAX_PENDING = 200  # jobs waiting across all channels before new sends are refused
+WORKERS = 4  # sends in flight at once, across all channels
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 1.0  # seconds before the first retry
+BACKOFF_CAP = 60.0
+
+
+class OutboxFull(Exception):
+    """Raised by `Outbox.enqueue` when the queue is saturated."""
+
+    def __init__(self, pending: int) -> None:
+        super().__init__(f"Send queue is full ({pending} messages waiting).")
+        self.pending = pending
+
+
+class OutboxJob:
+    """One message waiting to be sent to a channel."""
+
+    def __init__(self, job_id: int, user_id: int, channel_id: int, content: str, embeds: List[dict],
+                 attempts: int = 0) -> None:
+        self.id = job_id
+        self.user_id = user_id
+        self.channel_id = channel_id
+        self.content = content
+        self.embeds = embeds  # Embed.to_dict() payloads, so the job can be written to disk
+        self.attempts = attempts
+        self.done: Optional[asyncio.Future] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "channel_id": self.channel_id,
+            "content": self.content,
+            "embeds": self.embeds,
+            "attempts": self.attempts,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "OutboxJob":
+        return cls(
+            int(data["id"]),
+            int(data["user_id"]),
+            int(data["channel_id"]),
+            data.get("content") or "",
+            data.get("embeds") or [],
+            int(data.get("attempts", 0)),
+        )
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Rate limits, Discord server errors and dropped connections are worth retrying."""
+    if isinstance(exc, discord.HTTPException):
+        return exc.status == 429 or exc.status >= 500
+    return isinstance(exc, (OSError, asyncio.TimeoutError))
+
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE, cap: float = BACKOFF_CAP) -> float:
+    """Exponential backoff with full jitter for the given (1-based) attempt."""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class Outbox:
+    """Durable send queue drained by a fixed pool of workers.
+
+    Jobs for the same channel are sent strictly in order: a channel is handed to
+    one worker at a time and stays with it through retries. Pending jobs are
+    written to `path` (atomically, off the event loop) so they survive a restart.
+    """
+
+    def __init__(
+        self,
+        sender: Callable[[OutboxJob], Awaitable[Any]],
+        path: Optional[Path] = None,
+        on_delivered: Optional[Callable[[OutboxJob, Any], None]] = None,
+        workers: int = WORKERS,
+        max_pending: int = MAX_PENDING,
+        max_attempts: int = MAX_ATTEMPTS,
+        backoff: Callable[[int], float] = backoff_delay,
+    ) -> None:
+        self.sender = sender
+        self.path = path
+        self.on_delivered = on_delivered
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.stats: Counter = Counter()  # enqueued, delivered, retries, failed
+        self._channels: Dict[int, Deque[OutboxJob]] = {}
+        self._ready: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._ids = count(1)
+        self._pending = 0
+        self._writer = SnapshotWriter(path, self._snapshot, "send queue")
+
+    @property
+    def depth(self) -> int:
+        return self._pending
+
+    def metrics(self) -> Dict[str, int]:
+        return {"depth": self._pending, "channels": len(self._channels), **self.stats}
+
+    def start(self) -> None:
+        """Spawn the workers; safe to call more than once."""
+        if self._tasks:
+            return
+        self._ready = asyncio.Queue()
+        for channel_id in self._channels:
+            self._ready.put_nowait(channel_id)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._ready = None
+        await self._writer.flush()
+        self.save()
+
+    def enqueue(self, user_id: int, channel_id: int, content: str, embeds: List[dict]) -> OutboxJob:
+        if self._pending >= self.max_pending:
+            raise OutboxFull(self._pending)
+        job = OutboxJob(next(self._ids), user_id, channel_id, content, embeds)
+        job.done = asyncio.get_running_loop().create_future()
+        # Nobody may be waiting on the result any more; don't warn about unread errors.
+        job.done.add_done_callback(lambda fut: fut.cancelled() or fut.exception())
+        self._add(job)
+        self.stats["enqueued"] += 1
+        self._writer.request()
+        return job
+
+    def position(self, job: OutboxJob) -> int:
+        """1-based place of the job in its channel's queue, 0 once it has left."""
+        for index, queued in enumerate(self._channels.get(job.channel_id, ())):
+            if queued is job:
+                return index + 1
+        return 0
+
+    def _add(self, job: OutboxJob) -> None:
+        queue = self._channels.get(job.channel_id)
+        if queue is None:
+            queue = self._channels[job.channel_id] = deque()
+            if self._ready is not None:
+                self._ready.put_nowait(job.channel_id)
+        queue.append(job)
+        self._pending += 1
+
+    async def _worker(self) -> None:
+        assert self._ready is not None
+        while True:
+            channel_id = await self._ready.get()
+            queue = self._channels[channel_id]
+            while queue:
+                job = queue[0]
+                try:
+                    await self._deliver(job)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as exc:
+                    # A bug here must not kill the worker and strand the channel's queue.
+                    print(f"Error while sending queued message {job.id}: {exc!r}")
+                    if job.done is not None and not job.done.done():
+                        job.done.set_exception(exc)
+                queue.popleft()
+                self._pending -= 1
+                self._writer.request()
+            del self._channels[channel_id]
+
+    async def _deliver(self, job: OutboxJob) -> None:
+        while True:
+            job.attempts += 1
+            try:
+                result = await self.sender(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                if job.attempts < self.max_attempts and is_retryable(exc):
+                    self.stats["retries"] += 1
+                    delay = max(self.backoff(job.attempts), getattr(exc, "retry_after", 0) or 0)
+                    print(
+                        f"Retrying queued message {job.id} in {delay:.1f}s (attempt {job.attempts}: {exc}); "
+                        f"{self._pending} waiting, {self.stats['retries']} retries so far"
+                    )
+                    await asyncio.sleep(delay)
+                    continue
+                self.stats["failed"] += 1
+                if job.done is not None and not job.done.done():
+                    job.done.set_exception(exc)
+                else:
+                    print(f"Dropped queued message {job.id} for channel {job.channel_id}: {exc}")
+                return
+
+            self.stats["delivered"] += 1
+            if self.on_delivered is not None:
+                try:
+                    self.on_delivered(job, result)
+                except Exception as exc:
+                    # The message is out; a bookkeeping failure must not get it resent.
+                    print(f"on_delivered failed for queued message {job.id}: {exc!r}")
+            if job.done is not None and not job.done.done():
+                job.done.set_result(result)
+            return
+
+    def _snapshot(self) -> bytes:
+        return codec.dumps([job.to_dict() for queue in self._channels.values() for job in queue])
+
+    def save(self) -> None:
+        """Write the queue to disk now, bypassing the background writer."""
+        self._writer.write_now()
+
+    def load(self) -> None:
+        """Restore jobs left over from a previous run (call before `start`)."""
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            payload = codec.loads(self.path.read_bytes())
+        except (OSError, codec.CodecError) as exc:
+            print(f"Could not load send queue: {exc}")
+            return
+        for data in payload:
+            job = OutboxJob.from_dict(data)
+            self._add(job)
+            self._ids = count(max(job.id + 1, next(self._ids)))
+        if payload:
+            print(f"Restored {len(payload)} queued messages.")
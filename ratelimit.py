@@ -0,0 +1,93 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Optional, Tuple
+
+# scope -> (bucket capacity, tokens refilled per second)
+LIMITS: Dict[str, Tuple[float, float]] = {
+    "user": (20, 1.0),
+    "guild": (120, 4.0),
+    "import": (15, 0.25),  # parsing uploaded/local templates
+    "send": (12, 0.5),  # posting or editing channel messages
+}
+
+# command name -> (command class, token cost); anything else is ("basic", 1)
+COMMAND_COSTS: Dict[str, Tuple[str, float]] = {
+    "import": ("import", 5),
+    "import_file": ("import", 5),
+    "fields_bulk": ("import", 3),
+    "clone": ("import", 3),
+    "send": ("send", 3),
+    "edit": ("send", 2),
+}
+
+MAX_BUCKETS = 10000
+
+
+class TokenBuckets:
+    """Token buckets keyed by (scope, id), admitted all-or-nothing.
+
+    Buckets are kept in least-recently-used order. A bucket that has been idle
+    long enough to refill completely carries no state, so it is dropped; beyond
+    that, `max_buckets` caps memory outright.
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[float, float]] = LIMITS, max_buckets: int = MAX_BUCKETS) -> None:
+        self.limits = limits
+        self.max_buckets = max_buckets
+        # (scope, id) -> [tokens, last refill time]
+        self._buckets: "OrderedDict[Tuple[str, Hashable], list]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def _tokens(self, key: Tuple[str, Hashable], now: float) -> float:
+        capacity, rate = self.limits[key[0]]
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return capacity
+        return min(capacity, bucket[0] + (now - bucket[1]) * rate)
+
+    def acquire(self, keys: Iterable[Tuple[str, Hashable]], cost: float = 1, now: Optional[float] = None) -> float:
+        """Take `cost` tokens from every bucket, or none of them.
+
+        Returns 0 when admitted, otherwise the seconds until all buckets could
+        pay the cost.
+        """
+        now = time.monotonic() if now is None else now
+        keys = [key for key in keys if key[0] in self.limits]
+        retry_after = 0.0
+        levels = []
+        for key in keys:
+            tokens = self._tokens(key, now)
+            capacity, rate = self.limits[key[0]]
+            if tokens < cost:
+                needed = min(cost, capacity) - tokens
+                retry_after = max(retry_after, needed / rate)
+            levels.append(tokens)
+
+        if retry_after == 0:
+            for key, tokens in zip(keys, levels):
+                self._buckets[key] = [tokens - cost, now]
+                self._buckets.move_to_end(key)
+        self._evict(now)
+        return retry_after
+
+    def _evict(self, now: float) -> None:
+        while self._buckets:
+            key, (tokens, last) = next(iter(self._buckets.items()))
+            capacity, rate = self.limits[key[0]]
+            full = tokens + (now - last) * rate >= capacity
+            if not full and len(self._buckets) <= self.max_buckets:
+                break
+            self._buckets.popitem(last=False)
+
+
+def command_cost(name: str) -> Tuple[str, float]:
+    return COMMAND_COSTS.get(name, ("basic", 1))
+
+
+def admission_keys(command_class: str, user_id: int, guild_id: Optional[int]) -> list:
+    keys = [("user", user_id), (command_class, user_id)]
+    if guild_id is not None:
+        keys.append(("guild", guild_id))
+    return keys
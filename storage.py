@@ -0,0 +1,75 @@
+"""Crash-safe persistence for the bot's small state files."""
+import asyncio
+import os
+import tempfile
+from pathlib import Path
+from typing import Callable, Optional
+
+
+def atomic_write(path: Path, data: bytes) -> None:
+    """Replace `path` with `data` so readers see either the old or the new file, never half of one."""
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent or ".")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+
+class SnapshotWriter:
+    """Writes the latest snapshot of some state to `path` in a worker thread.
+
+    `request()` is cheap and may be called after every change: saves asked for
+    while a write is running are coalesced into one more write. Outside an
+    event loop the write happens immediately.
+    """
+
+    def __init__(self, path: Optional[Path], snapshot: Callable[[], bytes], label: str) -> None:
+        self.path = path
+        self.snapshot = snapshot
+        self.label = label
+        self._dirty = False
+        self._task: Optional[asyncio.Task] = None
+
+    def request(self) -> None:
+        if self.path is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.write_now()
+            return
+        self._dirty = True
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+
+    def write_now(self) -> None:
+        if self.path is None:
+            return
+        self._dirty = False
+        try:
+            atomic_write(self.path, self.snapshot())
+        except OSError as exc:
+            print(f"Could not save {self.label}: {exc}")
+
+    async def flush(self) -> None:
+        """Wait until every requested save has reached the disk."""
+        if self._task is not None:
+            await self._task
+
+    async def _run(self) -> None:
+        while self._dirty:
+            self._dirty = False
+            # The snapshot is taken on the loop so it is consistent; only the disk I/O moves off it.
+            data = self.snapshot()
+            try:
+                await asyncio.to_thread(atomic_write, self.path, data)
+            except OSError as exc:
+                print(f"Could not save {self.label}: {exc}")
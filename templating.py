@@ -0,0 +1,148 @@
+"""Placeholder substitution for message content and embed text.
+
+`{name}` is replaced by a variable and `{name:spec}` formats it (strftime for
+dates, `format()` for anything else). `{{` and `}}` give literal braces.
+Unknown names are left untouched so text that merely contains braces survives.
+Each distinct template string is parsed once and the compiled form is cached.
+
+Values given on the command line are text; a numeric spec such as `{count:03d}`
+or `{price:.2f}` converts them to a number first. Widths and precisions above
+MAX_FORMAT_WIDTH leave the placeholder as written, and output can be capped to
+a length limit so a template can't expand past what Discord accepts.
+"""
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Mapping, Optional, Tuple, Union
+
+_TOKEN = re.compile(r"\{\{|\}\}|\{([A-Za-z_][A-Za-z0-9_]*)(?::([^{}]*))?\}")
+# Standard format-spec mini-language: [[fill]align][sign][z][#][0][width][grouping][.precision][type]
+_FORMAT_SPEC = re.compile(r"(?:.?[<>=^])?[+\- ]?z?#?0?(\d*)[,_]?(?:\.(\d+))?([a-zA-Z%]?)", re.DOTALL)
+MAX_FORMAT_WIDTH = 64
+_NUMERIC_TYPES = set("bcdoxXneEfFgG%")
+
+
+def _spec_too_wide(spec: str) -> bool:
+    match = _FORMAT_SPEC.fullmatch(spec)
+    if match is None:
+        return False  # not a format spec (e.g. strftime), nothing gets padded
+    width, precision = match.group(1), match.group(2)
+    return any(number and int(number) > MAX_FORMAT_WIDTH for number in (width, precision))
+
+
+def _as_number(value: str) -> Union[int, float, str]:
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+class CompiledTemplate:
+    """A template split into literal text and (name, spec, original) slots."""
+
+    __slots__ = ("source", "parts")
+
+    def __init__(self, source: str, parts: Tuple[Union[str, Tuple[str, str, str]], ...]) -> None:
+        self.source = source
+        self.parts = parts
+
+    def render(self, values: Mapping[str, object], limit: Optional[int] = None) -> str:
+        """Substitute `values`; with `limit`, stop once that many characters are produced."""
+        if not self.parts:
+            return ""
+        if len(self.parts) == 1 and type(self.parts[0]) is str:
+            return self.parts[0][:limit]
+        out = []
+        length = 0
+        for part in self.parts:
+            if type(part) is str:
+                text = part
+            else:
+                name, spec, original = part
+                value = values.get(name)
+                if value is None:
+                    text = original
+                elif isinstance(value, datetime):
+                    try:
+                        text = value.strftime(spec or "%Y-%m-%d")
+                    except ValueError:
+                        # Windows rejects directives it doesn't know, such as %Q.
+                        text = original
+                elif spec:
+                    if isinstance(value, str) and spec[-1] in _NUMERIC_TYPES:
+                        value = _as_number(value)
+                    try:
+                        text = format(value, spec)
+                    except (ValueError, TypeError):
+                        text = str(value)
+                else:
+                    text = str(value)
+            out.append(text)
+            length += len(text)
+            if limit is not None and length >= limit:
+                break
+        return "".join(out)[:limit]
+
+
+@lru_cache(maxsize=2048)
+def compile_template(source: str) -> CompiledTemplate:
+    parts = []
+    literal = []
+    pos = 0
+    for match in _TOKEN.finditer(source):
+        literal.append(source[pos:match.start()])
+        token = match.group(0)
+        if token == "{{":
+            literal.append("{")
+        elif token == "}}":
+            literal.append("}")
+        else:
+            spec = match.group(2) or ""
+            if spec and _spec_too_wide(spec):
+                literal.append(token)
+                pos = match.end()
+                continue
+            if any(literal):
+                parts.append("".join(literal))
+            literal = []
+            parts.append((match.group(1), spec, token))
+        pos = match.end()
+    literal.append(source[pos:])
+    if any(literal):
+        parts.append("".join(literal))
+    return CompiledTemplate(source, tuple(parts))
+
+
+def render(source: str, values: Mapping[str, object], limit: Optional[int] = None) -> str:
+    if "{" not in source and "}" not in source:
+        return source[:limit]
+    return compile_template(source).render(values, limit)
+
+
+def parse_variables(raw: str) -> Tuple[bool, Dict[str, str] | str]:
+    """Parse `key=value; other=value` pairs given on the command line."""
+    values: Dict[str, str] = {}
+    for piece in raw.split(";"):
+        if not piece.strip():
+            continue
+        key, sep, value = piece.partition("=")
+        key = key.strip()
+        if not sep or not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", key):
+            return False, f"`{piece.strip()}` is not a key=value pair."
+        values[key] = value.strip()
+    return True, values
+
+
+if __name__ == "__main__":
+    import time
+
+    template = "Hi {user}, event on {date:%A %d %B} in {channel}: {count} seats left. {{literal}}"
+    started = time.perf_counter()
+    for index in range(100_000):
+        render(template, {"user": f"<@{index}>", "channel": "<#1>", "date": datetime.now(), "count": index})
+    elapsed = time.perf_counter() - started
+    print(f"{100_000 / elapsed:,.0f} renders/s ({compile_template.cache_info()})")
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The bot is a set of top-level scripts rather than a package.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
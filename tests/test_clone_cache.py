@@ -0,0 +1,172 @@
+import asyncio
+from types import SimpleNamespace
+
+import discord
+import pytest
+
+import embed_commands
+import embed_state
+from embed_state import MessageFetchCache
+
+
+class FakeFetcher:
+    """Stand-in for `fetch_message_data` that counts calls and can fail on demand."""
+
+    def __init__(self, delay: float = 0, channels: dict = None) -> None:
+        self.delay = delay
+        self.channels = channels or {}
+        self.calls = []
+        self.fail = False
+
+    async def __call__(self, channel_id: int, message_id: int):
+        self.calls.append((channel_id, message_id))
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise OSError("fetch failed")
+        channel = self.channels.get(channel_id, f"channel-{channel_id}")
+        return channel, {"content": f"message {message_id}", "embeds": []}
+
+
+def test_concurrent_gets_share_one_fetch():
+    async def scenario():
+        fetcher = FakeFetcher(delay=0.01)
+        cache = MessageFetchCache(fetcher)
+        results = await asyncio.gather(*(cache.get(1, 2) for _ in range(20)))
+        return fetcher, cache, results
+
+    fetcher, cache, results = asyncio.run(scenario())
+    assert fetcher.calls == [(1, 2)]
+    assert cache.fetches == 1
+    assert all(result == ("channel-1", {"content": "message 2", "embeds": []}) for result in results)
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(embed_state.time, "monotonic", lambda: clock[0])
+
+    async def scenario():
+        fetcher = FakeFetcher()
+        cache = MessageFetchCache(fetcher, ttl=60)
+        await cache.get(1, 2)
+        clock[0] += 59
+        await cache.get(1, 2)
+        assert len(fetcher.calls) == 1
+        clock[0] += 2
+        await cache.get(1, 2)
+        return fetcher
+
+    assert len(asyncio.run(scenario()).calls) == 2
+
+
+def test_failed_fetch_is_not_cached():
+    async def scenario():
+        fetcher = FakeFetcher()
+        cache = MessageFetchCache(fetcher)
+        fetcher.fail = True
+        with pytest.raises(OSError):
+            await cache.get(1, 2)
+        fetcher.fail = False
+        channel, data = await cache.get(1, 2)
+        return fetcher, channel, data
+
+    fetcher, channel, data = asyncio.run(scenario())
+    assert len(fetcher.calls) == 2
+    assert channel == "channel-1" and data["content"] == "message 2"
+
+
+def test_least_recently_used_entry_is_evicted():
+    async def scenario():
+        fetcher = FakeFetcher()
+        cache = MessageFetchCache(fetcher, max_entries=2)
+        await cache.get(1, 1)
+        await cache.get(1, 2)
+        await cache.get(1, 1)  # refreshes (1, 1), leaving (1, 2) the oldest
+        await cache.get(1, 3)
+        await cache.get(1, 1)
+        await cache.get(1, 2)
+        return fetcher
+
+    assert asyncio.run(scenario()).calls == [(1, 1), (1, 2), (1, 3), (1, 2)]
+
+
+class StubChannel:
+    """A server channel or thread: knows its guild and who may read its history."""
+
+    def __init__(self, guild_id: int, readers=(), parent_cached: bool = True) -> None:
+        self.guild = SimpleNamespace(id=guild_id)
+        self.readers = set(readers)
+        self.parent_cached = parent_cached
+
+    def permissions_for(self, user):
+        if not self.parent_cached:
+            raise discord.ClientException("Parent channel not found")
+        return SimpleNamespace(read_message_history=user.id in self.readers)
+
+
+class StubThread(StubChannel):
+    """Like `discord.Thread`, not an `abc.GuildChannel`, but with `permissions_for`."""
+
+
+class CloneInteraction:
+    def __init__(self, user_id: int, guild_id: int, channel_id: int) -> None:
+        self.id = user_id
+        self.user = SimpleNamespace(id=user_id)
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.replies = []
+        self._done = False
+        self.response = self
+        self.followup = self
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def defer(self, **kwargs) -> None:
+        self._done = True
+
+    async def send_message(self, content=None, **kwargs) -> None:
+        self._done = True
+        self.replies.append(content)
+
+    send = send_message
+
+
+GUILD, OTHER_GUILD, USER = 100, 200, 7
+CHANNELS = {
+    1: StubChannel(GUILD, readers={USER}),
+    2: StubChannel(OTHER_GUILD, readers={USER}),  # public channel in a server the user isn't in
+    3: StubThread(GUILD, readers=()),  # thread under a staff-only channel
+    4: StubThread(GUILD, readers={USER}),
+    5: StubThread(GUILD, readers={USER}, parent_cached=False),
+}
+
+
+def clone(monkeypatch, link: str) -> CloneInteraction:
+    fetcher = FakeFetcher(channels=CHANNELS)
+    monkeypatch.setattr(embed_commands, "message_cache", MessageFetchCache(fetcher))
+    monkeypatch.setattr(embed_state, "sessions", {})
+    interaction = CloneInteraction(USER, GUILD, channel_id=1)
+    group = embed_commands.EmbedCommands()
+    asyncio.run(group.clone.callback(group, interaction, link))
+    return interaction
+
+
+def test_clone_from_a_readable_channel(monkeypatch):
+    interaction = clone(monkeypatch, f"https://discord.com/channels/{GUILD}/1/50")
+    assert interaction.replies[-1].startswith("Loaded the message")
+    assert embed_state.sessions[USER].content == "message 50"
+
+
+def test_channel_from_another_server_is_refused(monkeypatch):
+    interaction = clone(monkeypatch, f"https://discord.com/channels/{GUILD}/2/50")
+    assert interaction.replies == ["You can only clone messages from the server or DM you're in."]
+    assert USER not in embed_state.sessions or not embed_state.sessions[USER].content
+
+
+@pytest.mark.parametrize("channel_id, allowed", [(3, False), (4, True), (5, False)])
+def test_threads_get_the_read_check(monkeypatch, channel_id, allowed):
+    interaction = clone(monkeypatch, f"https://discord.com/channels/{GUILD}/{channel_id}/50")
+    if allowed:
+        assert interaction.replies[-1].startswith("Loaded the message")
+    else:
+        assert interaction.replies == ["You can't read messages in that channel."]
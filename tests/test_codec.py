@@ -0,0 +1,117 @@
+from pathlib import Path
+
+import pytest
+
+import codec
+
+EXAMPLES = sorted((Path(__file__).resolve().parent.parent / "examples").glob("*.json"))
+
+SAMPLES = [
+    None,
+    True,
+    0,
+    -1,
+    2**63 - 1,
+    -(2**63),
+    2**64 - 1,
+    1.5,
+    -0.0,
+    "",
+    "héllo wörld – 🎉 中文",
+    [],
+    {},
+    {"content": "x", "embeds": [{"fields": [{"name": "a", "value": "b", "inline": True}] * 3}]},
+    [[[[{"deep": [1, [2, [3]]]}]]]],
+]
+
+
+@pytest.mark.parametrize("value", SAMPLES, ids=repr)
+def test_binary_round_trip(value):
+    assert codec.unpack(codec.pack(value)) == value
+    assert codec.decode(codec.pack(value)) == value
+
+
+@pytest.mark.parametrize("value", SAMPLES, ids=repr)
+@pytest.mark.parametrize("indent", [False, True])
+@pytest.mark.parametrize("backend", ["default", "stdlib"])
+def test_json_round_trip(value, indent, backend, monkeypatch):
+    if backend == "stdlib":
+        monkeypatch.setattr(codec, "orjson", None)
+    assert codec.loads(codec.dumps(value, indent=indent)) == value
+
+
+@pytest.mark.parametrize("value", [2**64, -(2**63) - 1, {"a": [2**70]}, {1: "x"}, object()], ids=repr)
+@pytest.mark.parametrize("backend", ["default", "stdlib"])
+def test_both_formats_reject_the_same_values(value, backend, monkeypatch):
+    if backend == "stdlib":
+        monkeypatch.setattr(codec, "orjson", None)
+    with pytest.raises(codec.CodecError):
+        codec.dumps(value)
+    with pytest.raises(codec.CodecError):
+        codec.pack(value)
+
+
+@pytest.mark.parametrize("path", EXAMPLES, ids=lambda p: p.name)
+def test_corpus_round_trips_and_binary_is_smaller(path):
+    data = codec.decode(path.read_bytes())
+    packed = codec.pack(data)
+    assert codec.unpack(packed) == data
+    assert codec.loads(codec.dumps(data)) == data
+    assert len(packed) < len(codec.dumps(data))
+
+
+def test_repeated_keys_are_stored_once():
+    fields = [{"name": str(i), "value": "v", "inline": False} for i in range(25)]
+    assert codec.pack(fields).count(b"inline") == 1
+
+
+def test_every_truncation_is_a_codec_error():
+    packed = codec.pack(codec.decode(EXAMPLES[0].read_bytes()))
+    for end in range(len(codec.BINARY_MAGIC), len(packed)):
+        with pytest.raises(codec.CodecError):
+            codec.unpack(packed[:end])
+
+
+@pytest.mark.parametrize(
+    "blob",
+    [
+        codec.BINARY_MAGIC + b"\x06\x01" * 5000 + b"\x00",  # lists nested 5000 deep
+        codec.BINARY_MAGIC + b"\x03" + b"\xff" * 65536,  # endless varint
+        codec.BINARY_MAGIC + b"\x04\x00",  # truncated float
+        codec.BINARY_MAGIC + b"\x07\x01\x09\x05\x00",  # key reference before any key
+        codec.BINARY_MAGIC + b"\x63",  # unknown tag
+        codec.BINARY_MAGIC + b"\x05\x02\xff\xfe",  # invalid UTF-8
+        codec.pack([1]) + b"\x00",  # trailing data
+        codec.BINARY_MAGIC + b"\x0a\x16" + str(2**70).encode(),  # retired big-integer tag
+    ],
+)
+def test_corrupt_binary_is_a_codec_error(blob):
+    with pytest.raises(codec.CodecError):
+        codec.decode(blob)
+
+
+def test_not_binary_is_rejected_by_unpack():
+    with pytest.raises(codec.CodecError):
+        codec.unpack(b'{"content": ""}')
+
+
+@pytest.mark.parametrize("backend", ["default", "stdlib"])
+def test_bad_json_is_a_codec_error(backend, monkeypatch):
+    if backend == "stdlib":
+        monkeypatch.setattr(codec, "orjson", None)
+    for blob in (b"{", b"\xff\xfe", b'{"a": }'):
+        with pytest.raises(codec.CodecError):
+            codec.decode(blob)
+
+
+def test_deep_json_on_stdlib_is_a_codec_error(monkeypatch):
+    monkeypatch.setattr(codec, "orjson", None)
+    with pytest.raises(codec.CodecError):
+        codec.decode(b"[" * 100000 + b"]" * 100000)
+
+
+def test_benchmark_runs_on_corpus(capsys):
+    codec._benchmark([str(p) for p in EXAMPLES], rounds=1)
+    out = capsys.readouterr().out
+    assert "mismatch" not in out
+    assert out.count("MB/s") == 2 * len(EXAMPLES)
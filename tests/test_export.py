@@ -0,0 +1,50 @@
+import io
+
+import discord
+import pytest
+
+import codec
+import embed_commands
+from embed_state import EmbedSession
+
+TRICKY = 'Quote " backslash \\ tab\t newline\nnon-ASCII: héllo – 🎉 中文 </script>'
+
+
+def full_session() -> EmbedSession:
+    session = EmbedSession()
+    session.content = f"Announcement: {TRICKY}"
+    embeds = []
+    for index in range(10):
+        embed = discord.Embed(
+            title=f"Embed {index} {TRICKY}"[:256],
+            description=f"{TRICKY}\n" * 3,
+            color=discord.Color(0x010203 * (index + 1)),
+        )
+        embed.set_author(name=f"Author {index} “quoted”", icon_url=f"https://example.com/{index}.png")
+        embed.set_thumbnail(url=f"https://example.com/thumb-{index}.png")
+        embed.set_image(url=f"https://example.com/image-{index}.png?a=1&b=\"2\"")
+        embed.set_footer(text=f"Footer {index} {TRICKY}")
+        for field in range(25):
+            embed.add_field(name=f"Field {field} \"{index}\"", value=f"{TRICKY} {field}", inline=field % 2 == 0)
+        embeds.append(embed)
+    session.embed, session.extra_embeds = embeds[0], embeds[1:]
+    return session
+
+
+@pytest.mark.parametrize("backend", ["default", "stdlib"])
+def test_export_loads_back_unchanged(backend, monkeypatch):
+    if backend == "stdlib":
+        monkeypatch.setattr(codec, "orjson", None)
+    session = full_session()
+    buffer = io.BytesIO()
+    embed_commands.write_session_json(session, buffer)
+
+    restored = EmbedSession()
+    ok, msg = embed_commands.apply_embed_data(restored, codec.decode(buffer.getvalue()))
+    assert ok, msg
+    assert restored.content == session.content
+    before = [e.to_dict() for e in [session.embed, *session.extra_embeds]]
+    after = [e.to_dict() for e in [restored.embed, *restored.extra_embeds]]
+    assert len(after) == 10
+    assert after == before
+
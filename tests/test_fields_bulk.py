@@ -0,0 +1,57 @@
+import asyncio
+
+import embed_commands
+from embed_state import EmbedSession
+
+
+def rules_table(rows: int = 25) -> str:
+    return "\n".join(f"Rule {i} | Be kind to member #{i}, no spam | {'yes' if i % 2 else 'no'}" for i in range(1, rows + 1))
+
+
+def test_full_table_applies_in_one_call():
+    session = EmbedSession()
+    ok, msg = embed_commands.apply_fields_table(session, rules_table())
+    assert ok, msg
+    fields = session.embed.fields
+    assert len(fields) == 25
+    assert (fields[0].name, fields[0].value, fields[0].inline) == ("Rule 1", "Be kind to member #1, no spam", True)
+    assert fields[1].inline is False
+
+
+def test_csv_and_tsv_with_header_and_quoted_values():
+    session = EmbedSession()
+    ok, _ = embed_commands.apply_fields_table(session, 'name,value,inline\n"a, b","line one\nline two",true\nc,d\n')
+    assert ok
+    ok, _ = embed_commands.apply_fields_table(session, "x\ty\tfalse")
+    assert ok
+    assert [(f.name, f.value, f.inline) for f in session.embed.fields] == [
+        ("a, b", "line one\nline two", True),
+        ("c", "d", False),
+        ("x", "y", False),
+    ]
+
+
+def test_limits_are_checked_before_anything_is_added():
+    session = EmbedSession()
+    session.embed.add_field(name="existing", value="v")
+    ok, msg = embed_commands.apply_fields_table(session, rules_table(25))
+    assert not ok and "25" in msg
+    assert len(session.embed.fields) == 1
+
+    ok, msg = embed_commands.apply_fields_table(session, "n | " + "v" * 1025)
+    assert not ok and "1024" in msg
+    ok, _ = embed_commands.apply_fields_table(session, rules_table(25), replace=True)
+    assert ok and len(session.embed.fields) == 25
+
+
+def test_oversized_csv_field_is_a_row_error():
+    ok, msg = embed_commands.parse_fields_table('a,"' + "x" * 200_000 + '"\n')
+    assert not ok
+    assert msg.startswith("Row 1")
+
+
+def test_fields_benchmark_runs(capsys):
+    asyncio.run(embed_commands._benchmark_fields(rounds=2))
+    out = capsys.readouterr().out
+    assert "add_field: 25 interaction(s) and 25 response(s)" in out
+    assert "fields_bulk: 1 interaction(s)" in out
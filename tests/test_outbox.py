@@ -0,0 +1,165 @@
+import asyncio
+from types import SimpleNamespace
+
+import discord
+import pytest
+
+from outbox import Outbox, OutboxFull
+
+
+def http_error(status: int) -> discord.HTTPException:
+    return discord.HTTPException(SimpleNamespace(status=status, reason="stand-in"), "injected failure")
+
+
+class FlakySender:
+    """Stand-in for channel.send that fails according to a per-job script."""
+
+    def __init__(self, failures=None) -> None:
+        self.failures = failures or {}  # job content -> list of exceptions raised before success
+        self.calls = []
+        self.sent = []
+
+    async def __call__(self, job):
+        self.calls.append(job.content)
+        await asyncio.sleep(0)
+        pending = self.failures.get(job.content)
+        if pending:
+            raise pending.pop(0)
+        self.sent.append((job.channel_id, job.content))
+        return f"message-{job.id}"
+
+
+def make_outbox(sender, tmp_path=None, **kwargs) -> Outbox:
+    kwargs.setdefault("backoff", lambda attempt: 0)
+    path = tmp_path / "outbox.json" if tmp_path is not None else None
+    return Outbox(sender, path, **kwargs)
+
+
+def test_retries_transient_errors_and_keeps_channel_order():
+    sender = FlakySender({
+        "a1": [http_error(503), http_error(429)],
+        "b0": [http_error(502)],
+        "a3": [OSError("connection reset")],
+    })
+
+    async def scenario():
+        outbox = make_outbox(sender, workers=3)
+        outbox.start()
+        jobs = [outbox.enqueue(1, channel, f"{channel}{i}", []) for i in range(5) for channel in ("a", "b")]
+        results = await asyncio.gather(*(job.done for job in jobs))
+        metrics = outbox.metrics()
+        await outbox.stop()
+        return jobs, results, metrics
+
+    jobs, results, metrics = asyncio.run(scenario())
+    assert results == [f"message-{job.id}" for job in jobs]
+    for channel in ("a", "b"):
+        assert [content for ch, content in sender.sent if ch == channel] == [f"{channel}{i}" for i in range(5)]
+    assert sender.calls.count("a1") == 3
+    assert metrics == {"depth": 0, "channels": 0, "enqueued": 10, "delivered": 10, "retries": 4}
+
+
+def test_non_retryable_error_fails_once_and_queue_moves_on():
+    sender = FlakySender({"x0": [http_error(403)]})
+
+    async def scenario():
+        outbox = make_outbox(sender)
+        outbox.start()
+        first = outbox.enqueue(1, 7, "x0", [])
+        second = outbox.enqueue(1, 7, "x1", [])
+        with pytest.raises(discord.HTTPException):
+            await first.done
+        assert await second.done == f"message-{second.id}"
+        metrics = outbox.metrics()
+        await outbox.stop()
+        return metrics
+
+    metrics = asyncio.run(scenario())
+    assert sender.calls == ["x0", "x1"]
+    assert metrics["failed"] == 1 and metrics["delivered"] == 1 and "retries" not in metrics
+
+
+def test_gives_up_after_max_attempts():
+    sender = FlakySender({"y": [http_error(500) for _ in range(10)]})
+
+    async def scenario():
+        outbox = make_outbox(sender, max_attempts=3)
+        outbox.start()
+        job = outbox.enqueue(1, 1, "y", [])
+        with pytest.raises(discord.HTTPException):
+            await job.done
+        metrics = outbox.metrics()
+        await outbox.stop()
+        return metrics
+
+    metrics = asyncio.run(scenario())
+    assert sender.calls == ["y", "y", "y"]
+    assert metrics["retries"] == 2 and metrics["failed"] == 1
+
+
+def test_backpressure_when_saturated():
+    async def scenario():
+        outbox = make_outbox(FlakySender(), max_pending=3)
+        for i in range(3):
+            outbox.enqueue(1, i, "m", [])
+        with pytest.raises(OutboxFull) as excinfo:
+            outbox.enqueue(1, 9, "m", [])
+        outbox.start()
+        await asyncio.sleep(0.05)
+        outbox.enqueue(1, 9, "m", [])  # room again once drained
+        depth = outbox.depth
+        await outbox.stop()
+        return excinfo.value, depth
+
+    full, depth = asyncio.run(scenario())
+    assert full.pending == 3
+    assert depth <= 1
+
+
+def test_failing_callback_does_not_kill_worker(capsys):
+    def on_delivered(job, result):
+        raise RuntimeError("bookkeeping broke")
+
+    async def scenario():
+        outbox = make_outbox(FlakySender(), on_delivered=on_delivered, workers=1)
+        outbox.start()
+        first = outbox.enqueue(1, 1, "c0", [])
+        second = outbox.enqueue(1, 1, "c1", [])
+        results = await asyncio.wait_for(asyncio.gather(first.done, second.done), timeout=1)
+        metrics = outbox.metrics()
+        await outbox.stop()
+        return results, metrics
+
+    results, metrics = asyncio.run(scenario())
+    assert len(results) == 2
+    assert metrics["depth"] == 0 and metrics["channels"] == 0
+    assert "bookkeeping broke" in capsys.readouterr().out
+
+
+def test_pending_jobs_survive_restart(tmp_path):
+    async def enqueue_only():
+        outbox = make_outbox(FlakySender(), tmp_path)
+        for i in range(3):
+            outbox.enqueue(5, 1, f"p{i}", [{"title": "t"}])
+        await outbox.stop()  # never started: everything is still pending
+
+    asyncio.run(enqueue_only())
+    assert not list(tmp_path.glob("*.tmp"))
+
+    sender = FlakySender()
+
+    async def resume():
+        outbox = make_outbox(sender, tmp_path)
+        outbox.load()
+        outbox.start()
+        for _ in range(100):
+            if not outbox.depth:
+                break
+            await asyncio.sleep(0.01)
+        await outbox.stop()
+
+    asyncio.run(resume())
+    assert sender.sent == [(1, "p0"), (1, "p1"), (1, "p2")]
+    reloaded = make_outbox(FlakySender(), tmp_path)
+    reloaded.load()
+    assert reloaded.depth == 0
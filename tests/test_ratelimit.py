@@ -0,0 +1,70 @@
+from ratelimit import LIMITS, TokenBuckets, admission_keys, command_cost
+
+GUILD = 99
+
+
+def run_load(duration: float = 60.0, step: float = 0.1):
+    """User 1 spams import_file every 0.1s; user 2 previews every 2s in the same guild."""
+    buckets = TokenBuckets()
+    callers = {1: (1, "import_file"), 2: (20, "preview")}  # user -> (period in steps, command)
+    admitted = {1: 0, 2: 0}
+    denied = {1: 0, 2: 0}
+    waits = []
+    for tick in range(int(duration / step)):
+        now = tick * step
+        for user, (period, command) in callers.items():
+            if tick % period:
+                continue
+            command_class, cost = command_cost(command)
+            retry_after = buckets.acquire(admission_keys(command_class, user, GUILD), cost, now=now)
+            if retry_after:
+                denied[user] += 1
+                if user == 1:
+                    waits.append(retry_after)
+            else:
+                admitted[user] += 1
+    return admitted, denied, waits
+
+
+def test_noisy_neighbour_does_not_starve_quiet_user():
+    admitted, denied, waits = run_load()
+    assert denied[2] == 0 and admitted[2] == 30
+    # The spammer gets its burst and then roughly the import refill rate.
+    capacity, rate = LIMITS["import"]
+    assert admitted[1] <= capacity / 5 + 60 * rate / 5 + 1
+    assert denied[1] > 500
+    assert all(0 < wait <= 5 / rate for wait in waits)
+
+
+def test_admission_is_all_or_nothing():
+    buckets = TokenBuckets({"user": (5, 1.0), "guild": (2, 1.0)})
+    keys = [("user", 1), ("guild", 7)]
+    assert buckets.acquire(keys, 2, now=0) == 0
+    assert buckets.acquire(keys, 1, now=0) == 1.0  # guild is empty
+    # The denied call must not have charged the user bucket.
+    assert buckets.acquire([("user", 1)], 3, now=0) == 0
+
+
+def test_unknown_scopes_are_ignored():
+    buckets = TokenBuckets({"user": (1, 1.0)})
+    assert buckets.acquire([("user", 1), ("basic", 1)], 1, now=0) == 0
+    assert len(buckets) == 1
+
+
+def test_idle_buckets_are_evicted():
+    buckets = TokenBuckets({"user": (10, 1.0)})
+    for user in range(100):
+        buckets.acquire([("user", user)], 1, now=0)
+    assert len(buckets) == 100
+    # After 10s every bucket has refilled, so touching any one sweeps the rest away.
+    buckets.acquire([("user", 1000)], 1, now=10)
+    assert len(buckets) == 1
+
+
+def test_bucket_count_is_capped():
+    buckets = TokenBuckets({"user": (10, 0.001)}, max_buckets=50)
+    for user in range(1000):
+        buckets.acquire([("user", user)], 5, now=user * 0.001)
+        assert len(buckets) <= 50
+    # The newest users are the ones kept.
+    assert buckets.acquire([("user", 999)], 6, now=1.0) > 0
@@ -0,0 +1,122 @@
+import asyncio
+from types import SimpleNamespace
+
+import embed_state
+from embed_state import ResponsePolicy
+
+
+class StubResponse:
+    def __init__(self, calls: list) -> None:
+        self.calls = calls
+        self.done = False
+
+    def is_done(self) -> bool:
+        return self.done
+
+    async def defer(self, **kwargs) -> None:
+        self.calls.append(("defer", None))
+        self.done = True
+
+    async def send_message(self, content=None, **kwargs) -> None:
+        self.calls.append(("send_message", content))
+        self.done = True
+
+    async def send_modal(self, modal) -> None:
+        self.calls.append(("send_modal", modal))
+        self.done = True
+
+
+class StubFollowup:
+    def __init__(self, calls: list) -> None:
+        self.calls = calls
+
+    async def send(self, content=None, **kwargs) -> None:
+        self.calls.append(("followup", content))
+
+
+class StubInteraction:
+    """Just enough of `discord.Interaction` to record how a command answered."""
+
+    def __init__(self, interaction_id: int = 1, command: str = "embed send") -> None:
+        self.id = interaction_id
+        self.command = SimpleNamespace(qualified_name=command)
+        self.calls = []
+        self.response = StubResponse(self.calls)
+        self.followup = StubFollowup(self.calls)
+
+
+def run_command(body, budget: float, interaction=None):
+    """Run `body(interaction)` under a policy, the way `interaction_check` and the completion hook do."""
+    interaction = interaction or StubInteraction()
+
+    async def scenario():
+        embed_state.response_policies[interaction.id] = ResponsePolicy(interaction, budget)
+        try:
+            await body(interaction)
+        finally:
+            embed_state.finish_response_policy(interaction)
+
+    asyncio.run(scenario())
+    return interaction
+
+
+def test_slow_reply_is_auto_deferred_and_sent_as_followup():
+    async def slow(interaction):
+        await asyncio.sleep(0.05)
+        await embed_state.respond(interaction, "done")
+
+    interaction = run_command(slow, budget=0.01)
+    assert interaction.calls == [("defer", None), ("followup", "done")]
+
+
+def test_fast_reply_is_never_deferred():
+    async def fast(interaction):
+        await embed_state.respond(interaction, "done")
+        await asyncio.sleep(0.03)  # well past the budget; the timer must already be stopped
+        await embed_state.respond(interaction, "more")
+
+    interaction = run_command(fast, budget=0.01)
+    assert interaction.calls == [("send_message", "done"), ("followup", "more")]
+
+
+def test_finish_counts_calls_and_slow_paths(monkeypatch):
+    monkeypatch.setattr(embed_state, "command_calls", embed_state.Counter())
+    monkeypatch.setattr(embed_state, "slow_path_calls", embed_state.Counter())
+
+    async def slow(interaction):
+        await asyncio.sleep(0.03)
+        await embed_state.respond(interaction, "slow")
+
+    async def fast(interaction):
+        await embed_state.respond(interaction, "fast")
+
+    run_command(slow, budget=0.01, interaction=StubInteraction(1, "embed import"))
+    run_command(fast, budget=0.01, interaction=StubInteraction(2, "embed import"))
+    run_command(fast, budget=0.01, interaction=StubInteraction(3, "embed preview"))
+
+    assert embed_state.command_calls == {"embed import": 2, "embed preview": 1}
+    assert embed_state.slow_path_calls == {"embed import": 1}
+    assert not embed_state.response_policies
+
+
+def test_modal_after_auto_defer_asks_to_run_again():
+    modal = object()
+
+    async def slow_form(interaction):
+        await asyncio.sleep(0.03)
+        await embed_state.send_modal(interaction, modal)
+
+    interaction = run_command(slow_form, budget=0.01)
+    assert interaction.calls[0] == ("defer", None)
+    assert interaction.calls[1][0] == "followup" and "run the command again" in interaction.calls[1][1]
+    assert ("send_modal", modal) not in interaction.calls
+
+
+def test_modal_in_time_is_opened():
+    modal = object()
+
+    async def form(interaction):
+        await embed_state.send_modal(interaction, modal)
+
+    interaction = run_command(form, budget=0.05)
+    assert interaction.calls == [("send_modal", modal)]
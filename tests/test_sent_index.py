@@ -0,0 +1,116 @@
+from types import SimpleNamespace
+
+import discord
+
+import embed_commands
+import embed_state
+from embed_state import SentMessageIndex, message_changes
+from outbox import OutboxJob
+
+
+def sample_embed(title: str = "Weekly update") -> discord.Embed:
+    embed = discord.Embed(title=title, description="Line one\nLine two ✨", color=discord.Color(0x5865F2))
+    embed.set_author(name="Staff", icon_url="https://example.com/a.png")
+    embed.set_footer(text="See you {user}")
+    embed.set_thumbnail(url="https://example.com/t.png")
+    embed.add_field(name="When", value="Friday", inline=True)
+    embed.add_field(name="Where", value="Stage", inline=False)
+    return embed
+
+
+def recorded(content: str, embeds) -> list:
+    index = SentMessageIndex()
+    index.record(1, 2, 3, content, embeds)
+    return index.lookup(1, 2)
+
+
+def test_unchanged_message_needs_no_edit():
+    record = recorded("hello", [sample_embed()])
+    assert message_changes(record, "hello", [sample_embed()]) == {}
+
+
+def test_only_the_changed_part_is_edited():
+    embeds = [sample_embed()]
+    record = recorded("hello", embeds)
+
+    assert message_changes(record, "hello again", [sample_embed()]) == {"content": "hello again"}
+    assert message_changes(record, "", [sample_embed()]) == {"content": None}
+
+    changed = [sample_embed("Monthly update")]
+    assert message_changes(record, "hello", changed) == {"embeds": changed}
+    both = message_changes(record, "bye", changed)
+    assert set(both) == {"content", "embeds"}
+
+
+def test_adding_an_embed_resends_all_of_them():
+    record = recorded("", [sample_embed()])
+    embeds = [sample_embed(), sample_embed("Second")]
+    assert message_changes(record, "", embeds) == {"embeds": embeds}
+
+
+def test_least_recently_used_pairs_are_evicted():
+    index = SentMessageIndex(max_keys=2)
+    index.record(1, 10, 100, "a", [])
+    index.record(2, 10, 200, "b", [])
+    index.lookup(1, 10)  # (1, 10) is now the most recently used
+    index.record(3, 10, 300, "c", [])
+
+    assert len(index) == 2
+    assert index.lookup(2, 10) is None
+    assert index.lookup(1, 10)[0] == 100
+    assert index.lookup(3, 10)[0] == 300
+
+
+def test_only_recent_messages_per_pair_are_kept():
+    index = SentMessageIndex(per_key=3)
+    for message_id in range(1, 6):
+        index.record(1, 10, message_id, f"m{message_id}", [])
+    index.record(1, 10, 4, "edited", [])  # re-recording moves it to the newest slot
+
+    assert index.lookup(1, 10)[0] == 4
+    assert [index.lookup(1, 10, m) is not None for m in range(1, 6)] == [False, False, True, True, True]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = tmp_path / "sent_index.json"
+    index = SentMessageIndex(path)
+    index.record(1, 10, 100, "hello", [sample_embed()])
+    index.record(2, 20, 200, "", [sample_embed(), sample_embed("Other")])
+    index.save()
+
+    restored = SentMessageIndex(path, max_keys=1)
+    restored.load()
+    assert len(restored) == 1
+    assert restored.lookup(2, 20) == index.lookup(2, 20)
+
+    restored = SentMessageIndex(path)
+    restored.load()
+    assert restored.lookup(1, 10) == index.lookup(1, 10)
+    assert message_changes(restored.lookup(1, 10), "hello", [sample_embed()]) == {}
+
+
+def test_corrupt_index_file_is_ignored(tmp_path):
+    path = tmp_path / "sent_index.json"
+    path.write_text("{not json")
+    index = SentMessageIndex(path)
+    index.load()
+    assert len(index) == 0
+
+
+def test_sent_message_matches_an_unchanged_edit(monkeypatch):
+    """`/embed send` records what the outbox delivered; `/embed edit` must see it as unchanged."""
+    index = SentMessageIndex()
+    monkeypatch.setattr(embed_state, "sent_index", index)
+    values = {"user": "<@1>", "channel": "<#10>", "server": "Guild"}
+    session_embeds = [sample_embed(), sample_embed("Second {channel}")]
+
+    # What `send` queues: rendered embeds as dicts.
+    job = OutboxJob(1, 1, 10, "Hi {user}", [embed_commands.render_embed(e, values).to_dict() for e in session_embeds])
+    job.content = embed_commands.render(job.content, values)
+    message = SimpleNamespace(id=500, channel=SimpleNamespace(id=10))
+    embed_state.job_delivered(job, message)
+
+    # What `edit` compares against: the same session rendered again.
+    content = embed_commands.render("Hi {user}", values, embed_commands.MAX_CONTENT)
+    embeds = [embed_commands.render_embed(e, values) for e in session_embeds]
+    assert message_changes(index.lookup(1, 10, 500), content, embeds) == {}
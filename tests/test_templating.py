@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from templating import MAX_FORMAT_WIDTH, parse_variables, render
+
+
+def test_basic_substitution_and_escapes():
+    assert render("Hi {user}! {{x}} {missing}", {"user": "Ana"}) == "Hi Ana! {x} {missing}"
+    assert render("{when:%d/%m}", {"when": datetime(2024, 5, 1)}) == "01/05"
+
+
+def test_numeric_specs_convert_command_line_values():
+    ok, values = parse_variables("count=7; price=3.5; name=abc")
+    assert ok
+    assert render("{count:03d} {price:.2f} {name:d}", values) == "007 3.50 abc"
+
+
+def test_huge_width_is_left_as_written():
+    template = "{x:>100000000}|{x:.99999}|{x:>10}"
+    assert render(template, {"x": "a"}) == "{x:>100000000}|{x:.99999}|         a"
+    assert render("{x:>%d}" % MAX_FORMAT_WIDTH, {"x": "a"}).endswith("a")
+
+
+def test_limit_caps_output():
+    values = {"x": "y" * 5000}
+    assert render("{x}{x}{x}", values, 2000) == "y" * 2000
+    assert render("plain text", {}, 5) == "plain"
+    assert len(render("{x} and {x}", values)) == 10005
+
+
+class StrictDatetime(datetime):
+    """strftime as on Windows, where unknown directives raise."""
+
+    def strftime(self, spec):
+        if "%Q" in spec:
+            raise ValueError("Invalid format string")
+        return super().strftime(spec)
+
+
+def test_invalid_date_directive_keeps_the_placeholder():
+    when = StrictDatetime(2024, 5, 1)
+    assert render("On {date:%Q} / {date:%d}", {"date": when}) == "On {date:%Q} / 01"
@@ -0,0 +1,162 @@
+import io
+import json
+import zipfile
+
+import pytest
+
+import codec
+import webapp
+
+TEMPLATE = {"content": "hello", "embeds": [{"title": "Hi", "fields": [{"name": "a", "value": "b"}]}]}
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(webapp, "TEMPLATE_DIR", tmp_path)
+    return webapp.APP.test_client()
+
+
+def make_zip(entries, compression=zipfile.ZIP_STORED) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=compression) as archive:
+        for name, data in entries:
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def upload(client, blob: bytes) -> dict:
+    reply = client.post("/templates/import", data={"file": (io.BytesIO(blob), "templates.zip")})
+    assert reply.status_code == 200
+    return reply.get_json()
+
+
+def test_export_streams_templates_but_not_state_files(client, tmp_path):
+    for index in range(3):
+        (tmp_path / f"t{index}.json").write_text(json.dumps(TEMPLATE))
+    (tmp_path / "sent_index.json").write_text("{}")
+    (tmp_path / "notes.txt").write_text("not a template")
+
+    reply = client.get("/templates/archive")
+    assert reply.is_streamed
+    with zipfile.ZipFile(io.BytesIO(reply.get_data())) as archive:
+        assert sorted(archive.namelist()) == ["t0.json", "t1.json", "t2.json"]
+        assert archive.testzip() is None
+
+
+def test_round_trip_through_import(client, tmp_path):
+    (tmp_path / "a.json").write_text(json.dumps(TEMPLATE))
+    blob = client.get("/templates/archive").get_data()
+    (tmp_path / "a.json").unlink()
+
+    result = upload(client, blob)
+    assert (result["imported"], result["skipped"]) == (1, 0)
+    assert json.loads((tmp_path / "a.json").read_text()) == TEMPLATE
+
+
+def test_bad_crc_is_reported_per_entry(client, tmp_path):
+    good = json.dumps(TEMPLATE).encode()
+    bad = json.dumps({"content": "corrupt me"}).encode()
+    blob = bytearray(make_zip([("good.json", good), ("bad.json", bad)]))
+    offset = blob.index(b"corrupt me")
+    blob[offset] ^= 0x20  # stored data no longer matches the recorded CRC
+
+    result = upload(client, bytes(blob))
+    assert result["imported"] == 1
+    assert [error["name"] for error in result["errors"]] == ["bad.json"]
+    assert "corrupt entry" in result["errors"][0]["error"]
+    assert not (tmp_path / "bad.json").exists()
+
+
+def test_corrupt_deflate_stream_is_reported(client):
+    data = json.dumps({"content": "x" * 2000}).encode()
+    blob = bytearray(make_zip([("deflated.json", data)], compression=zipfile.ZIP_DEFLATED))
+    start = 30 + len("deflated.json")  # local header + name, no extra field
+    blob[start:start + 8] = b"\xff" * 8
+
+    result = upload(client, bytes(blob))
+    assert result["imported"] == 0
+    assert result["errors"][0]["error"].startswith("corrupt entry")
+
+
+def test_same_name_in_different_folders_is_a_duplicate(client, tmp_path):
+    first = json.dumps({"content": "first"})
+    second = json.dumps({"content": "second"})
+    result = upload(client, make_zip([("a/welcome.json", first), ("b/welcome.json", second)]))
+
+    assert (result["imported"], result["skipped"]) == (1, 1)
+    assert result["errors"] == [{"name": "b/welcome.json", "error": "duplicate of a/welcome.json"}]
+    assert json.loads((tmp_path / "welcome.json").read_text())["content"] == "first"
+
+
+def test_invalid_entries_do_not_stop_the_import(client, tmp_path):
+    deep = b"[" * 100_000 + b"]" * 100_000
+    entries = [("deep.json", deep), ("broken.json", b"{"), ("readme.txt", b"hi"), ("ok.json", json.dumps(TEMPLATE))]
+    result = upload(client, make_zip(entries))
+
+    assert result["imported"] == 1
+    assert sorted(error["name"] for error in result["errors"]) == ["broken.json", "deep.json", "readme.txt"]
+    assert (tmp_path / "ok.json").exists()
+
+
+def test_archive_benchmark_runs(tmp_path, capsys):
+    template = tmp_path / "sample.json"
+    template.write_text(json.dumps(TEMPLATE))
+    before = webapp.TEMPLATE_DIR
+    webapp._benchmark_archive([str(template)], copies=5, rounds=1)
+    assert "5 templates" in capsys.readouterr().out
+    assert webapp.TEMPLATE_DIR is before
+
+
+def test_upload_rejects_values_the_target_format_cannot_hold(client, tmp_path):
+    big = codec.BINARY_MAGIC + b"\x0a\x16" + str(2**70).encode()  # big-integer tag from older builds
+    reply = client.post("/upload?file_name=x.json", data={"file": (io.BytesIO(big), "x.embt")})
+    assert reply.status_code == 400
+    assert not (tmp_path / "x.json").exists()
+
+    data = {"content": "", "count": 2**64 - 1}
+    reply = client.post("/upload?format=binary", data={"file": (io.BytesIO(json.dumps(data).encode()), "n.json")})
+    assert reply.status_code == 200
+    assert codec.decode((tmp_path / "n.embt").read_bytes()) == data
+
+
+def test_upload_encode_failure_is_a_400_on_stdlib(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(codec, "orjson", None)
+    blob = json.dumps({"content": "", "count": 2**70}).encode()
+    for query in ("file_name=big.json", "format=binary"):
+        reply = client.post(f"/upload?{query}", data={"file": (io.BytesIO(blob), "big.json")})
+        assert reply.status_code == 400
+        assert "64-bit" in reply.get_json()["error"]
+    assert not list(tmp_path.iterdir())
+
+
+def test_state_files_configured_by_path_are_protected(client, tmp_path, monkeypatch):
+    index = tmp_path / "bot-data" / ".." / "index.json"
+    monkeypatch.setattr(webapp, "STATE_FILES", {index.resolve(), (tmp_path / "queue.json").resolve()})
+    (tmp_path / "index.json").write_text("[]")
+    (tmp_path / "queue.json").write_text("[]")
+    (tmp_path / "welcome.json").write_text(json.dumps(TEMPLATE))
+
+    with zipfile.ZipFile(io.BytesIO(client.get("/templates/archive").get_data())) as archive:
+        assert archive.namelist() == ["welcome.json"]
+
+    blob = json.dumps(TEMPLATE).encode()
+    for query in ("file_name=queue.json", "file_name=queue&format=binary", "file_name=sub/index.json"):
+        reply = client.post(f"/upload?{query}", data={"file": (io.BytesIO(blob), "t.json")})
+        if "binary" in query:
+            assert reply.status_code == 200  # queue.embt is not the bot's file
+        else:
+            assert reply.status_code == 400
+    assert (tmp_path / "queue.json").read_text() == "[]"
+
+    result = upload(client, make_zip([("backup/index.json", blob), ("ok.json", blob)]))
+    assert result["imported"] == 1
+    assert "used by the bot" in result["errors"][0]["error"]
+    assert (tmp_path / "index.json").read_text() == "[]"
+
+
+def test_default_state_file_names_cannot_be_uploaded(client, tmp_path):
+    blob = json.dumps(TEMPLATE).encode()
+    for name in ("outbox.json", "sent_index.json"):
+        reply = client.post(f"/upload?file_name={name}", data={"file": (io.BytesIO(blob), "t.json")})
+        assert reply.status_code == 400
+    assert not list(tmp_path.iterdir())
@@ -1,17 +1,115 @@
-import json
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+import zlib
+from fnmatch import fnmatch
 from pathlib import Path
+from typing import Optional
 
-from flask import Flask, jsonify, render_template_string, request, send_file
+from flask import Flask, Response, jsonify, render_template_string, request, send_file, stream_with_context
+
+import codec
 
 APP = Flask(__name__)
 DEFAULT_FILE = "embed_config.json"
+TEMPLATE_DIR = Path(os.getenv("EMBED_TEMPLATE_DIR", "."))
+# Bot bookkeeping that may sit next to the templates but is not one (same settings as the bot).
+STATE_FILES = {
+    Path(os.getenv("EMBED_SENT_INDEX_FILE", "sent_index.json")).resolve(),
+    Path(os.getenv("EMBED_OUTBOX_FILE", "outbox.json")).resolve(),
+}
+MAX_TEMPLATE_SIZE = 256 * 1024  # same limit as /embed import_file
+CHUNK_SIZE = 64 * 1024
+MAX_REPORTED_ERRORS = 50
+
+
+def is_state_file(path: Path) -> bool:
+    """Whether `path` is one of the bot's own files, by name or by where it resolves to."""
+    return any(path.name == state.name for state in STATE_FILES) or path.resolve() in STATE_FILES
 
 
-def safe_json_path(name: str) -> Path:
+def safe_json_path(name: str, directory: Optional[Path] = None) -> Path:
+    """Template path for `name`; raises ValueError if that would be one of the bot's state files."""
     base = Path(name).name or DEFAULT_FILE
-    if not base.lower().endswith(".json"):
+    if not base.lower().endswith((".json", codec.BINARY_SUFFIX)):
         base = f"{base}.json"
-    return Path(base)
+    path = (directory or TEMPLATE_DIR) / base
+    if is_state_file(path):
+        raise ValueError(f"{base} is used by the bot and can't be a template name")
+    return path
+
+
+def is_template_name(name: str) -> bool:
+    return name.lower().endswith((".json", codec.BINARY_SUFFIX))
+
+
+def iter_template_paths(pattern: str = "*", directory: Optional[Path] = None):
+    """Yield stored template files one at a time, without listing the directory up front."""
+    with os.scandir(directory or TEMPLATE_DIR) as entries:
+        for entry in entries:
+            if entry.is_file() and is_template_name(entry.name) and fnmatch(entry.name, pattern):
+                path = Path(entry.path)
+                if not is_state_file(path):
+                    yield path
+
+
+def validate_template(data) -> str:
+    """Return an error message, or an empty string if `data` looks like an embed template."""
+    if not isinstance(data, dict):
+        return "top level must be an object"
+    if not isinstance(data.get("content") or "", str):
+        return "content must be text"
+    embeds = data.get("embeds")
+    if embeds is not None:
+        if not isinstance(embeds, list) or not all(isinstance(e, dict) for e in embeds):
+            return "embeds must be a list of objects"
+        if len(embeds) > 10:
+            return "at most 10 embeds are allowed"
+    return ""
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, non-seekable target for ZipFile whose bytes are handed out as they arrive."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._chunks = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_archive(paths):
+    """Generate a ZIP of `paths` piece by piece; only one chunk is held at a time."""
+    sink = _ChunkSink()
+    # ZipFile falls back to data descriptors on a non-seekable target, so nothing is rewritten later.
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for path in paths:
+            info = zipfile.ZipInfo.from_file(path, arcname=path.name)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with open(path, "rb") as src, archive.open(info, "w") as dest:
+                while chunk := src.read(CHUNK_SIZE):
+                    dest.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            data = sink.drain()
+            if data:
+                yield data
+    yield sink.drain()
 
 HTML = """
 <!doctype html>
@@ -88,7 +186,8 @@ HTML = """
     <div class="card">
       <button onclick="downloadCurrent()">Download JSON</button>
       <label style="margin-left:12px;">File name <input type="text" id="fileName" value="embed_export.json" style="margin-left:6px; width:200px;" /></label>
-      <label style="margin-left:12px;">Upload JSON <input type="file" id="upload" accept="application/json" style="margin-left:6px;" /></label>
+      <label style="margin-left:12px;">Upload JSON <input type="file" id="upload" accept="application/json,.embt" style="margin-left:6px;" /></label>
+      <a href="/templates/archive" style="margin-left:12px; color: var(--accent);">Download all templates (ZIP)</a>
       <span class="status" id="status"></span>
     </div>
 
@@ -476,20 +575,155 @@ def upload():
     if not file:
         return jsonify({"error": "No file uploaded"}), 400
     try:
-        data = json.load(file)
-    except json.JSONDecodeError as exc:
-        return jsonify({"error": f"Invalid JSON: {exc}"}), 400
+        data = codec.decode(file.read())
+    except codec.CodecError as exc:
+        return jsonify({"error": f"Invalid template: {exc}"}), 400
 
     file_name = request.args.get("file_name") or file.filename or DEFAULT_FILE
-    path = safe_json_path(file_name)
+    if request.args.get("format") == "binary":
+        file_name = Path(Path(file_name).name or DEFAULT_FILE).with_suffix(codec.BINARY_SUFFIX).name
+    try:
+        path = safe_json_path(file_name)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
 
     try:
-        path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        if path.suffix.lower() == codec.BINARY_SUFFIX:
+            encoded = codec.pack(data)
+        else:
+            encoded = codec.dumps(data, indent=True)
+    except codec.CodecError as exc:
+        return jsonify({"error": f"Invalid template: {exc}"}), 400
+    try:
+        path.write_bytes(encoded)
     except OSError as exc:
         return jsonify({"error": f"Failed to write file: {exc}"}), 500
 
     return jsonify({"status": "ok", "path": str(path.resolve())})
 
 
+@APP.route("/templates/archive", methods=["GET"])
+def export_archive():
+    pattern = request.args.get("match") or "*"
+    headers = {"Content-Disposition": 'attachment; filename="embed_templates.zip"'}
+    return Response(
+        stream_with_context(stream_archive(iter_template_paths(pattern))),
+        mimetype="application/zip",
+        headers=headers,
+    )
+
+
+def read_archive_entry(archive: zipfile.ZipFile, info: zipfile.ZipInfo):
+    """Read and validate one archive entry; return (raw bytes, error message)."""
+    try:
+        with archive.open(info) as entry:
+            raw = entry.read(MAX_TEMPLATE_SIZE + 1)
+        if len(raw) > MAX_TEMPLATE_SIZE:
+            return b"", "larger than 256KB"
+        return raw, validate_template(codec.decode(raw))
+    except codec.CodecError as exc:
+        return b"", f"invalid template: {exc}"
+    except RuntimeError as exc:
+        # Encrypted entries; RecursionError is a RuntimeError too.
+        return b"", f"unreadable entry: {exc}"
+    except (zipfile.BadZipFile, zlib.error, NotImplementedError, EOFError, OSError) as exc:
+        # Bad CRC, corrupt deflate data, unsupported compression, truncated archive.
+        return b"", f"corrupt entry: {exc}"
+
+
+@APP.route("/templates/import", methods=["POST"])
+def import_archive():
+    file = request.files.get("file")
+    if not file:
+        return jsonify({"error": "No file uploaded"}), 400
+    try:
+        # Werkzeug spools large uploads to disk, so ZipFile can seek without holding the archive in memory.
+        archive = zipfile.ZipFile(file.stream)
+    except zipfile.BadZipFile as exc:
+        return jsonify({"error": f"Not a ZIP archive: {exc}"}), 400
+    with archive:
+        return jsonify({"status": "ok", **import_templates(archive)})
+
+
+def store_archive_entry(archive: zipfile.ZipFile, info: zipfile.ZipInfo, directory: Optional[Path]) -> str:
+    """Validate one entry and write it to the template directory; return an error message or ""."""
+    try:
+        path = safe_json_path(info.filename, directory)
+    except ValueError as exc:
+        return str(exc)
+    raw, error = read_archive_entry(archive, info)
+    if error:
+        return error
+    try:
+        path.write_bytes(raw)
+    except OSError as exc:
+        return f"failed to write: {exc}"
+    return ""
+
+
+def import_templates(archive: zipfile.ZipFile, directory: Optional[Path] = None) -> dict:
+    """Write every valid template in `archive` to the template directory; report the rest."""
+    imported = 0
+    errors = []
+    skipped = 0
+    seen = {}  # stored file name -> entry it was imported from
+    for info in archive.infolist():
+        if info.is_dir():
+            continue
+        name = Path(info.filename).name
+        if not is_template_name(name):
+            error = "not a .json or .embt template"
+        elif info.file_size > MAX_TEMPLATE_SIZE:
+            error = "larger than 256KB"
+        elif name in seen:
+            # Entries are stored flat, so a second one with the same name would overwrite the first.
+            error = f"duplicate of {seen[name]}"
+        else:
+            error = store_archive_entry(archive, info, directory)
+            if not error:
+                seen[name] = info.filename
+
+        if error:
+            skipped += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"name": info.filename, "error": error})
+        else:
+            imported += 1
+
+    return {"imported": imported, "skipped": skipped, "errors": errors}
+
+
+def _benchmark_archive(paths, copies: int = 200, rounds: int = 3) -> None:
+    """Time ZIP export and import of `copies` duplicates of each given template."""
+    source = Path(tempfile.mkdtemp(prefix="embed-bench-"))
+    target = Path(tempfile.mkdtemp(prefix="embed-bench-"))
+    try:
+        for path in map(Path, paths):
+            for index in range(copies):
+                shutil.copyfile(path, source / f"{path.stem}-{index}{path.suffix}")
+        for _ in range(rounds):
+            start = time.perf_counter()
+            archive = b"".join(stream_archive(iter_template_paths("*", source)))
+            exported = time.perf_counter() - start
+
+            start = time.perf_counter()
+            with zipfile.ZipFile(io.BytesIO(archive)) as zipped:
+                result = import_templates(zipped, target)
+            imported = time.perf_counter() - start
+            count = result["imported"]
+            print(
+                f"{count} templates, {len(archive) / 1e6:.2f} MB zipped: "
+                f"export {count / exported:,.0f}/s, import {count / imported:,.0f}/s"
+            )
+    finally:
+        shutil.rmtree(source, ignore_errors=True)
+        shutil.rmtree(target, ignore_errors=True)
+
+
 if __name__ == "__main__":
-    APP.run(host="127.0.0.1", port=5000, debug=False)
+    if sys.argv[1:2] == ["benchmark"]:
+        if len(sys.argv) < 3:
+            raise SystemExit("Usage: python webapp.py benchmark template.json [more.json ...]")
+        _benchmark_archive(sys.argv[2:])
+    else:
+        APP.run(host="127.0.0.1", port=5000, debug=False)